@@ -1,7 +1,35 @@
+import hashlib
+import logging
+import os
+import time
 import streamlit as st
-import spacy
 import pandas as pd
 import plotly.express as px
+from profiling import StageTimer, Profile, stage_record
+from engine import (
+    EventAnalyzer, SentenceCache, StartupLog, load_classifier_model, load_grammar_model, load_cascade_config,
+    warm_up, STAGE_FAST, CATEGORIES, CAT_BATCH_SIZE, CAT_N_PROCESS, SENTENCE_CACHE_SIZE
+)
+from results_store import ResultStore
+from batch_jobs import BatchRunner, read_documents
+from event_store import EventStore
+
+# --- PARAMETRY PRZETWARZANIA ---
+LONG_TEXT_THRESHOLD = 50000     # powyżej tej liczby znaków tekst analizowany fragmentami
+PROGRESS_EVERY = 200            # co ile zdań odświeżać licznik postępu
+BATCH_POLL_INTERVAL = 1.0   # co ile sekund odświeżać postęp zlecenia wsadowego
+PAGE_SIZES = [10, 25, 50, 100]     # dostępne rozmiary strony listy wyników
+DEFAULT_PAGE_SIZE = 25
+EXPORT_FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+PROFILERS = {"Wyłączony": None, "cProfile": "cprofile", "pyinstrument": "pyinstrument"}
+USE_CASCADE = True      # szybki model najpierw, HerBERT tylko dla niepewnych zdań (wymaga models/cascade.json)
+SEARCH_LIMIT = 200      # maksymalna liczba zdarzeń w wynikach wyszukiwania
+SEARCH_PERIODS = {"Cały okres": None, "Ostatnie 24 h": 1, "Ostatni tydzień": 7, "Ostatnie 30 dni": 30}
+
+# --- LOGI ---
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s: %(message)s")
+logger = logging.getLogger("event_analyzer")
+stage_logger = logging.getLogger("event_analyzer.stages")     # jedna linia JSON z czasami etapów na przebieg
 
 # --- KONFIGURACJA STRONY ---
 st.set_page_config(
@@ -26,59 +54,223 @@ st.markdown("""
 
 # --- ŁADOWANIE MODELI ---
 @st.cache_resource
-def load_classifier_model():
-    try:
-        return spacy.load("models/output_herbert/model-best") 
-    except OSError:
+def load_analyzer():
+    startup = StartupLog()
+    nlp_cat = load_classifier_model()
+    if nlp_cat is None:
         return None
-
-@st.cache_resource
-def load_grammar_model():
+    startup.step("klasyfikator")
     try:
-        if not spacy.util.is_package("pl_core_news_lg"):
-            spacy.cli.download("pl_core_news_lg")
-        return spacy.load("pl_core_news_lg")
+        # Tylko komponenty potrzebne ekstrakcji; bez pobierania modelu w trakcie działania
+        nlp_gram = load_grammar_model()
     except Exception as e:
         st.error(f"Błąd ładowania modelu gramatycznego: {e}")
         return None
+    startup.step("gramatyka")
 
-# --- FUNKCJA EKSTRAKCJI ---
-def extract_details(doc):
-    data = {"TRIGGER": "-", "KTO": "-", "CO": "-", "GDZIE": "-", "KIEDY": "-"}
-    try:
-        root = [token for token in doc if token.dep_ == "ROOT"][0]
-        data["TRIGGER"] = root.lemma_
-    except IndexError:
-        return data
-
-    for child in root.children:
-        subtree_text = " ".join([t.text for t in child.subtree])
-        if child.dep_ == "nsubj":
-            data["KTO"] = subtree_text
-        elif child.dep_ in ["obj", "nsubj:pass"]:
-            data["CO"] = subtree_text
-        elif child.dep_ == "obl":
-            ents_labels = [e.ent_type_ for e in child.subtree if e.ent_type_]
-            if any(l in ["placeName", "geogName", "GPE", "LOC"] for l in ents_labels):
-                data["GDZIE"] = subtree_text
-            elif any(l in ["date", "time"] for l in ents_labels) or any(w in subtree_text for w in ["wczoraj", "dziś", "jutro", "roku"]):
-                data["KIEDY"] = subtree_text
-            elif " w " in " "+subtree_text or " na " in " "+subtree_text: 
-                if data["GDZIE"] == "-": data["GDZIE"] = subtree_text
-
-    for ent in doc.ents:
-        if ent.label_ in ["placeName", "geogName", "GPE", "LOC"] and data["GDZIE"] == "-":
-            data["GDZIE"] = ent.text
-        if ent.label_ in ["date", "time"] and data["KIEDY"] == "-":
-            data["KIEDY"] = ent.text
-    return data
+    # Kaskada tylko z progiem dobranym przez code/cascade_tuning.py
+    cascade = load_cascade_config() if USE_CASCADE else None
+    nlp_fast = load_classifier_model(cascade["fast_model"]) if cascade else None
+    if nlp_fast is not None:
+        startup.step("szybki model")
+
+    warm_up(nlp_cat, nlp_gram, nlp_fast)
+    startup.step("rozgrzewka")
+    summary = startup.summary()
+    logger.info(summary)
+
+    analyzer = EventAnalyzer(
+        nlp_cat, nlp_gram,
+        batch_size=CAT_BATCH_SIZE,
+        n_process=CAT_N_PROCESS,
+        cache=SentenceCache(SENTENCE_CACHE_SIZE),
+        nlp_fast=nlp_fast,
+        margin=cascade["margin"] if nlp_fast is not None else None,
+        startup=summary
+    )
+    return analyzer
 
 # --- INICJALIZACJA ---
-nlp_cat = load_classifier_model()
-nlp_gram = load_grammar_model()
+analyzer = load_analyzer()
+
+# --- STATYSTYKI I WYKRES KOŁOWY ---
+def show_stats(stats, total):
+    st.divider()
+    st.subheader("📊 Statystyki")
+    cols = st.columns(6)
+    cols[0].metric("Wszystkie", total)
+    cols[1].metric("Przestępstwa", stats.get("PRZESTEPSTWO", 0))
+    cols[2].metric("Polityka", stats.get("POLITYKA", 0))
+    cols[3].metric("Biznes", stats.get("BIZNES", 0))
+    cols[4].metric("Wypadki", stats.get("WYPADEK", 0))
+    cols[5].metric("Katastrofy", stats.get("KATASTROFA", 0))
+    
+    df_stats = pd.DataFrame(list(stats.items()), columns=["Kategoria", "Liczba"])
+    if not df_stats.empty and df_stats['Liczba'].sum() > 0:
+        fig = px.pie(
+            df_stats, values='Liczba', names='Kategoria', hole=0.4, height=450
+        )
+        fig.update_layout(legend=dict(font=dict(size=18), orientation="v"))
+        fig.update_traces(textinfo='value+percent', textposition='inside', textfont_size=16)
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+         st.info("Brak danych do wyświetlenia na wykresie.")
+
+# --- EKSPORT ---
+def drop_export(state_key):
+    # Usuwa przygotowany wcześniej plik tymczasowy eksportu
+    export = st.session_state.pop(state_key, None)
+    if export is not None and os.path.exists(export[1]):
+        os.remove(export[1])
+
+def prepare_export(state_key, export_format, export_file):
+    drop_export(state_key)
+    st.session_state[state_key] = (export_format, export_file(export_format))
+
+def download_export(export, label, file_name):
+    # Plik czytany bezpośrednio przez przycisk pobierania, bez dodatkowej kopii w session_state
+    with open(export[1], 'rb') as f:
+        st.download_button(label=label, data=f, file_name=file_name, mime=EXPORT_FORMATS[export[0]])
+
+# --- BAZA ZDARZEŃ ---
+@st.cache_resource
+def load_event_store():
+    # Jedno połączenie SQLite na proces aplikacji (dostęp chroniony blokadą w EventStore)
+    return EventStore()
+
+def save_results(results, source):
+    store = load_event_store()
+    return store.add_records((results.record(i) for i in range(len(results))), source=source)
+
+def save_batch_job(job):
+    # Każdy dokument pod własnym kluczem (nazwa + skrót treści) - pliki o tej samej nazwie się nie nadpisują.
+    # Rekordy kopiowane pod blokadą zlecenia, zapis do SQLite już bez niej.
+    store = load_event_store()
+    return sum(store.add_records(records, source=key) for key, records in job.documents())
+
+def render_search():
+    store = load_event_store()
+    st.caption(f"🗄️ Zdarzeń w bazie: {store.size()}")
+
+    query = st.text_input("Szukaj w treści zdań:", placeholder="np. złodziej tramwaj")
+    col_label, col_score, col_period = st.columns([2, 1, 1])
+    with col_label:
+        labels = st.multiselect("Kategorie:", CATEGORIES, default=[c for c in CATEGORIES if c != "BRAK_ZDARZENIA"])
+    with col_score:
+        min_score = st.slider("Minimalna pewność:", 0.0, 1.0, 0.0, 0.05)
+    with col_period:
+        period = st.selectbox("Przetworzone:", list(SEARCH_PERIODS))
+    col_trigger, col_kto, col_gdzie, col_kiedy = st.columns(4)
+    with col_trigger:
+        trigger = st.text_input("TRIGGER (lemat):", placeholder="np. ukraść")
+    with col_kto:
+        kto = st.text_input("KTO:")
+    with col_gdzie:
+        gdzie = st.text_input("GDZIE:", placeholder="np. Kraków")
+    with col_kiedy:
+        kiedy = st.text_input("KIEDY:", placeholder="np. wczoraj")
+
+    days = SEARCH_PERIODS[period]
+    filters = dict(
+        text=query.strip(), label=labels, min_score=min_score or None, trigger=trigger.strip(),
+        kto=kto, gdzie=gdzie, kiedy=kiedy, since=time.time() - days * 86400 if days else None
+    )
+    start = time.perf_counter()
+    total = store.count(**filters)
+    events = store.search(limit=SEARCH_LIMIT, **filters)
+    elapsed = time.perf_counter() - start
+
+    st.caption(f"Znaleziono {total} zdarzeń ({elapsed * 1000:.1f} ms), pokazano {len(events)} najnowszych")
+    if events:
+        df = pd.DataFrame(events).drop(columns=["id", "position"]).fillna("-")
+        df["created_at"] = pd.to_datetime(df["created_at"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+        df = df.rename(columns={
+            "source": "Źródło", "text": "Zdanie", "label": "Etykieta", "score": "Pewnosc", "trigger": "TRIGGER",
+            "kto": "KTO", "co": "CO", "gdzie": "GDZIE", "kiedy": "KIEDY", "created_at": "Przetworzono"
+        })
+        st.dataframe(
+            df,
+            hide_index=True,
+            use_container_width=True,
+            column_config={"Pewnosc": st.column_config.ProgressColumn("Pewnosc", format="%.2f", min_value=0, max_value=1)}
+        )
+
+# --- TRYB WSADOWY ---
+@st.cache_resource
+def load_batch_runner():
+    # Pula procesów wspólna dla wszystkich sesji; modele ładowane w workerach przy pierwszym zleceniu
+    return BatchRunner()
+
+def render_batch():
+    runner = load_batch_runner()
+    uploaded = st.file_uploader(
+        "Pliki artykułów (.txt) lub archiwa ZIP:", type=["txt", "md", "zip"], accept_multiple_files=True
+    )
+    if st.button("🚀 Uruchom analizę wsadową", type="primary", disabled=not uploaded):
+        documents = list(read_documents((f.name, f.getvalue()) for f in uploaded))
+        if documents:
+            st.session_state["batch_job"] = runner.submit(documents).id
+            drop_export("batch_export")
+        else:
+            st.warning("Brak plików tekstowych do analizy.")
+
+    # Zlecenie żyje w BatchRunner - odświeżenie strony tylko odczytuje jego postęp
+    job_id = st.session_state.get("batch_job")
+    job = runner.get(job_id)
+    if job is None:
+        if job_id is not None:
+            st.info("Wyniki zlecenia nie są już przechowywane (zapisane w bazie zdarzeń albo wygasły).")
+        return
+
+    done, total = job.done, job.total
+    elapsed = (job.finished or time.time()) - job.started
+    st.progress(done / total if total else 1.0, text=f"Dokumenty: {done}/{total} ({elapsed:.0f} s)")
+
+    show_stats(job.label_counts(), len(job.results))
+
+    st.subheader("📄 Dokumenty")
+    table = job.document_table()
+    if table:
+        st.dataframe(pd.DataFrame(table), hide_index=True, use_container_width=True)
+    for name, error in job.errors:
+        st.error(f"{name}: {error}")
+
+    if job.running:
+        time.sleep(BATCH_POLL_INTERVAL)
+        st.rerun()
+
+    # --- EKSPORT ---
+    st.divider()
+    export_format = st.selectbox("Format:", list(EXPORT_FORMATS), key="batch_export_format")
+    export = st.session_state.get("batch_export")
+    if export is None or export[0] != export_format:
+        if st.button("📦 Przygotuj eksport"):
+            prepare_export("batch_export", export_format, job.export_file)
+            st.rerun()
+    else:
+        download_export(
+            export,
+            label=f"📥 Pobierz wyniki wszystkich dokumentów ({export_format.upper()})",
+            file_name=f'analiza_wsadowa.{export_format}'
+        )
+    if len(job.results) and st.button("💾 Zapisz w bazie zdarzeń", key="batch_store"):
+        added = save_batch_job(job)
+        runner.discard(job.id)
+        drop_export("batch_export")
+        st.success(f"Zapisano {added} nowych zdarzeń. Wyniki są dostępne w wyszukiwarce bazy zdarzeń.")
 
 # --- GŁÓWNY INTERFEJS ---
 st.title("🕵️‍♂️ NLP News Intelligence")
+if analyzer:
+    st.caption(f"⏱️ {analyzer.startup}")
+
+mode = st.radio("Tryb:", ["📝 Tekst", "📁 Wsadowo (pliki)", "🔎 Baza zdarzeń"], horizontal=True)
+if mode == "📁 Wsadowo (pliki)":
+    render_batch()
+    st.stop()
+if mode == "🔎 Baza zdarzeń":
+    render_search()
+    st.stop()
 
 default_text = """Złodziej ukradł portfel pasażerowi w tramwaju. Policja szybko ujęła sprawcę. 
 Premier odwołał ministra zdrowia wczoraj wieczorem. 
@@ -97,146 +289,199 @@ with col_opt:
 with col_btn:
     run_button = st.button("🚀 Analizuj", type="primary", use_container_width=True)
 
+# --- DIAGNOSTYKA ---
+with st.sidebar:
+    show_debug = st.checkbox("🐞 Panel diagnostyczny", value=False)
+    profiler_name = st.selectbox("Profiler:", list(PROFILERS), disabled=not show_debug)
+
 # --- ANALIZA ---
+# Wyniki trzymane w session_state - zmiana strony lub widoku nie uruchamia analizy ponownie
 if run_button and text_input:
-    if not nlp_cat or not nlp_gram:
+    if not analyzer:
         st.error("Błąd: Modele nie są dostępne.")
         st.stop()
 
     with st.spinner("Przetwarzanie..."):
-        doc_whole = nlp_gram(text_input)
-        sentences = list(doc_whole.sents)
-        
-        results = []
-        stats = {"BRAK_ZDARZENIA": 0, "PRZESTEPSTWO": 0, "POLITYKA": 0, "BIZNES": 0, "KATASTROFA": 0, "WYPADEK": 0}
-        
-        for sent in sentences:
-            sent_text = sent.text.strip()
-            if len(sent_text) < 5: continue
-            
-            # Klasyfikacja
-            doc_cat = nlp_cat(sent_text)
-            scores = doc_cat.cats
-            best_label = max(scores, key=scores.get)
-            best_score = scores[best_label]
-            
-            if best_label in stats:
-                stats[best_label] += 1
-            
-            # Ekstrakcja
-            doc_sent_gram = sent.as_doc() 
-            details = extract_details(doc_sent_gram)
-            
-            results.append({
-                "text": sent_text,
-                "label": best_label,
-                "score": best_score,
-                "scores_full": scores,
-                "details": details
-            })
+        # Pomiar etapów zawsze włączony (tani); profiler tylko na żądanie z panelu diagnostycznego
+        timer = StageTimer()
+        cache_before = analyzer.cache.stats()
+        with Profile(PROFILERS[profiler_name] if show_debug else None) as profile:
+            # Długie teksty fragmentami - bez limitu max_length i bez parsowania całości naraz
+            if len(text_input) > LONG_TEXT_THRESHOLD:
+                records = analyzer.analyze_long(text_input, timer=timer)
+            else:
+                records = analyzer.analyze(text_input, timer=timer)
 
-    # --- WYNIKI: STATYSTYKI ---
-    st.divider()
-    st.subheader("📊 Statystyki")
-    cols = st.columns(6)
-    cols[0].metric("Wszystkie", len(sentences))
-    cols[1].metric("Przestępstwa", stats.get("PRZESTEPSTWO", 0))
-    cols[2].metric("Polityka", stats.get("POLITYKA", 0))
-    cols[3].metric("Biznes", stats.get("BIZNES", 0))
-    cols[4].metric("Wypadki", stats.get("WYPADEK", 0))
-    cols[5].metric("Katastrofy", stats.get("KATASTROFA", 0))
-    
-    # --- WYKRES KOŁOWY ---
-    df_stats = pd.DataFrame(list(stats.items()), columns=["Kategoria", "Liczba"])
-    if not df_stats.empty and df_stats['Liczba'].sum() > 0:
-        fig = px.pie(
-            df_stats, values='Liczba', names='Kategoria', hole=0.4, height=450
+            # Wyniki od razu w formie kolumnowej - bez listy słowników na każde zdanie
+            results = ResultStore()
+            progress = st.empty()
+            for count, record in enumerate(records, 1):
+                results.append(record)
+                if count % PROGRESS_EVERY == 0:
+                    progress.caption(f"Przeanalizowano {count} zdań...")
+            progress.empty()
+        cache_after = analyzer.cache.stats()
+        stats = results.label_counts()
+    stage_logger.info(stage_record(timer, source="app", sentences=len(results)))
+
+    st.session_state["analysis"] = {
+        "run_id": st.session_state.get("analysis", {}).get("run_id", 0) + 1,
+        "results": results,
+        # Ten sam tekst zapisany ponownie nie dubluje zdarzeń w bazie
+        "source": "tekst:" + hashlib.sha1(text_input.encode('utf-8')).hexdigest()[:12],
+        "stats": stats,
+        "cache_before": cache_before,
+        "cache_after": cache_after,
+        "stages": timer.report(),
+        "profile": profile.text
+    }
+    st.session_state["page"] = 1
+    drop_export("export")
+
+analysis = st.session_state.get("analysis")
+if analysis:
+    render_start = time.perf_counter()
+    results = analysis["results"]
+    stats = analysis["stats"]
+    cache_before, cache_after = analysis["cache_before"], analysis["cache_after"]
+
+    # --- CACHE ZDAŃ ---
+    run_hits = cache_after["hits"] - cache_before["hits"]
+    run_misses = cache_after["misses"] - cache_before["misses"]
+    st.caption(
+        f"♻️ Cache zdań: w tym przebiegu {run_hits} z cache, {run_misses} przeliczonych | "
+        f"łącznie trafienia {cache_after['hits']}, chybienia {cache_after['misses']}, "
+        f"usunięte {cache_after['evictions']} | rozmiar {cache_after['size']}/{cache_after['max_size']}"
+    )
+    if analyzer.nlp_fast is not None:
+        fast_count = results.stage_count(STAGE_FAST)
+        st.caption(
+            f"⚡ Kaskada (próg {analyzer.margin}): {fast_count} zdań rozstrzygniętych szybkim modelem, "
+            f"{len(results) - fast_count} przez HerBERT"
         )
-        fig.update_layout(legend=dict(font=dict(size=18), orientation="v"))
-        fig.update_traces(textinfo='value+percent', textposition='inside', textfont_size=16)
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-         st.info("Brak danych do wyświetlenia na wykresie.")
 
-    # --- WYNIKI: LISTA SZCZEGÓŁOWA (ULEPSZONA) ---
+    # --- WYNIKI: STATYSTYKI ---
+    show_stats(stats, len(results))
+
+    # --- WYNIKI: LISTA (STRONICOWANA) ---
     st.subheader("📝 Szczegółowa Lista Wyników")
-    
-    found_important = False
-    
-    for item in results:
-        label = item['label']
-        if hide_none and label == "BRAK_ZDARZENIA":
-            continue
-            
-        found_important = True
-        score = item['score']
-        text = item['text']
-        
-        icon_map = {
-            "PRZESTEPSTWO": "🚓", "POLITYKA": "🏛️", "BIZNES": "💼", 
-            "WYPADEK": "🚑", "KATASTROFA": "🔥", "BRAK_ZDARZENIA": "⚪"
-        }
-        icon = icon_map.get(label, "❓")
-        
-        with st.expander(f"{icon} **{label}** ({score:.1%}): {text}", expanded=(label != "BRAK_ZDARZENIA")):
-            c1, c2 = st.columns([1, 1])
-            
-            with c1:
-                st.markdown("**Rozkład prawdopodobieństwa:**")
-                
-                # PRZYGOTOWANIE DANYCH DO NOWEGO WYKRESU
-                df_scores = pd.DataFrame(list(item['scores_full'].items()), columns=["Kategoria", "Pewnosc"])
-                df_scores = df_scores.sort_values(by="Pewnosc", ascending=True)
-                
-                # WYKRES POZIOMY PLOTLY
-                fig_bar = px.bar(
-                    df_scores, 
-                    x="Pewnosc", 
-                    y="Kategoria", 
-                    orientation='h',
-                    text_auto='.1%',
-                    range_x=[0, 1]
-                )
-                
-                # Stylizacja wykresu słupkowego
-                fig_bar.update_layout(
-                    height=250,
-                    margin=dict(l=0, r=0, t=0, b=0),
-                    xaxis_title=None,
-                    yaxis_title=None,
-                    showlegend=False
-                )
-                fig_bar.update_traces(textfont_size=12, marker_color='#4CAF50')
-                st.plotly_chart(fig_bar, use_container_width=True)
-
-            with c2:
-                st.markdown("**Szczegóły zdarzenia:**")
-                if any(v != "-" for v in item['details'].values()):
-                    df_det = pd.DataFrame(item['details'].items(), columns=["Pole", "Wartość"])
-                    st.data_editor(
-                        df_det, 
-                        hide_index=True, 
-                        use_container_width=True, 
-                        disabled=True
-                    )
-                else:
-                    st.info("Nie udało się wyodrębnić szczegółów (Kto/Co/Gdzie).")
-
-    if not found_important and hide_none:
-        st.info("Wszystkie zdania zostały zaklasyfikowane jako BRAK_ZDARZENIA. Odznacz checkbox powyżej i kliknij ponownie 'Analizuj', aby je zobaczyć.")
+
+    # Indeksy zamiast kopii rekordów - filtr jest tani także dla bardzo długich artykułów
+    visible = results.indices("BRAK_ZDARZENIA" if hide_none else None)
+
+    col_view, col_size, col_page = st.columns([2, 1, 1])
+    with col_view:
+        view = st.radio("Widok:", ["Tabela", "Szczegóły"], horizontal=True)
+    with col_size:
+        page_size = st.selectbox("Zdań na stronę:", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE))
+    pages = max(1, -(-len(visible) // page_size))
+    if st.session_state.get("page", 1) > pages:
+        st.session_state["page"] = pages
+    with col_page:
+        page = st.number_input(f"Strona (z {pages}):", min_value=1, max_value=pages, key="page")
+    page_indices = visible[(page - 1) * page_size : page * page_size]
+
+    icon_map = {
+        "PRZESTEPSTWO": "🚓", "POLITYKA": "🏛️", "BIZNES": "💼", 
+        "WYPADEK": "🚑", "KATASTROFA": "🔥", "BRAK_ZDARZENIA": "⚪"
+    }
+
+    if view == "Tabela":
+        # Jedna kompaktowa tabela dla całej strony zamiast wykresu i tabeli na każde zdanie
+        rows = []
+        for idx in page_indices:
+            item = results.record(idx)
+            row = {"Nr": idx + 1, "Etykieta": f"{icon_map.get(item['label'], '❓')} {item['label']}",
+                   "Pewnosc": item['score'], "Zdanie": item['text']}
+            row.update(item['details'])
+            rows.append(row)
+        if rows:
+            st.dataframe(
+                pd.DataFrame(rows),
+                hide_index=True,
+                use_container_width=True,
+                column_config={"Pewnosc": st.column_config.ProgressColumn("Pewnosc", format="%.2f", min_value=0, max_value=1)}
+            )
+    else:
+        for idx in page_indices:
+            item = results.record(idx)
+            label = item['label']
+            score = item['score']
+            text = item['text']
+            icon = icon_map.get(label, "❓")
+
+            with st.expander(f"{icon} **{label}** ({score:.1%}): {text}", expanded=False):
+                c1, c2 = st.columns([1, 1])
+
+                with c1:
+                    # Wykres budowany dopiero na żądanie - zamknięte wiersze nic nie kosztują
+                    if st.checkbox("📊 Rozkład prawdopodobieństwa", key=f"chart_{analysis['run_id']}_{idx}"):
+                        df_scores = pd.DataFrame(list(item['scores_full'].items()), columns=["Kategoria", "Pewnosc"])
+                        df_scores = df_scores.sort_values(by="Pewnosc", ascending=True)
+
+                        # WYKRES POZIOMY PLOTLY
+                        fig_bar = px.bar(
+                            df_scores, 
+                            x="Pewnosc", 
+                            y="Kategoria", 
+                            orientation='h',
+                            text_auto='.1%',
+                            range_x=[0, 1]
+                        )
+
+                        # Stylizacja wykresu słupkowego
+                        fig_bar.update_layout(
+                            height=250,
+                            margin=dict(l=0, r=0, t=0, b=0),
+                            xaxis_title=None,
+                            yaxis_title=None,
+                            showlegend=False
+                        )
+                        fig_bar.update_traces(textfont_size=12, marker_color='#4CAF50')
+                        st.plotly_chart(fig_bar, use_container_width=True)
+
+                with c2:
+                    st.markdown("**Szczegóły zdarzenia:**")
+                    if any(v != "-" for v in item['details'].values()):
+                        st.markdown("  \n".join(f"**{k}:** {v}" for k, v in item['details'].items()))
+                    else:
+                        st.info("Nie udało się wyodrębnić szczegółów (Kto/Co/Gdzie).")
+
+    if not len(visible) and hide_none:
+        st.info("Wszystkie zdania zostały zaklasyfikowane jako BRAK_ZDARZENIA. Odznacz checkbox powyżej, aby je zobaczyć.")
 
     # --- EKSPORT ---
-    if results:
+    # Plik przygotowywany na żądanie, strumieniowo z kolumn (bez pośredniego DataFrame)
+    if len(results):
         st.divider()
-        export_data = []
-        for r in results:
-            row = {"Zdanie": r['text'], "Etykieta": r['label'], "Pewnosc": r['score']}
-            row.update(r['details'])
-            export_data.append(row)
-            
-        st.download_button(
-            label="📥 Pobierz wszystkie wyniki (CSV)",
-            data=pd.DataFrame(export_data).to_csv(index=False).encode('utf-8'),
-            file_name='analiza.csv',
-            mime='text/csv',
-        )
\ No newline at end of file
+        col_fmt, col_export = st.columns([1, 3])
+        with col_fmt:
+            export_format = st.selectbox("Format:", list(EXPORT_FORMATS), key="export_format")
+        with col_export:
+            st.write("")
+            export = st.session_state.get("export")
+            if export is None or export[0] != export_format:
+                if st.button("📦 Przygotuj eksport"):
+                    prepare_export("export", export_format, results.export_file)
+                    st.rerun()
+            else:
+                download_export(
+                    export,
+                    label=f"📥 Pobierz wszystkie wyniki ({export_format.upper()})",
+                    file_name=f'analiza.{export_format}'
+                )
+            if st.button("💾 Zapisz w bazie zdarzeń"):
+                added = save_results(results, source=analysis["source"])
+                st.success(f"Zapisano {added} nowych zdarzeń.")
+
+    # --- PANEL DIAGNOSTYCZNY ---
+    if show_debug:
+        with st.expander("🐞 Diagnostyka: czasy etapów", expanded=True):
+            df_stages = pd.DataFrame(
+                [{"Etap": name, "Czas [s]": v["seconds"], "Liczba": v["count"]} for name, v in analysis["stages"].items()]
+                + [{"Etap": "render (ten przebieg)", "Czas [s]": time.perf_counter() - render_start, "Liczba": len(page_indices)}]
+            )
+            st.dataframe(df_stages, hide_index=True, use_container_width=True)
+            st.caption(f"Pamięć wyników: {results.nbytes() / 1024:.0f} KB dla {len(results)} zdań")
+            if analysis["profile"]:
+                st.code(analysis["profile"], language=None)
\ No newline at end of file
@@ -0,0 +1,243 @@
+import hashlib
+import io
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from engine import (
+    EventAnalyzer, CLASSIFIER_PATH, GRAMMAR_MODEL, CAT_BATCH_SIZE, CATEGORIES, LONG_CHUNK_CHARS,
+    set_child_threads, set_torch_threads
+)
+from results_store import ResultStore
+
+# --- KONFIGURACJA ---
+BATCH_WORKERS = max(1, (os.cpu_count() or 1) // 2)   # procesy robocze z własnymi modelami
+THREADS_PER_WORKER = 2
+DOCS_PER_TASK = 8               # dokumentów w jednym zadaniu (parsowane razem przez nlp.pipe)
+MAX_PENDING_PER_WORKER = 2      # ile zadań naraz może czekać na jednego workera
+TEXT_EXTENSIONS = (".txt", ".md")
+JOB_TTL = 3600                  # ile sekund po zakończeniu zlecenie (z wynikami) zostaje w pamięci
+MAX_FINISHED_JOBS = 8           # najwięcej przechowywanych zakończonych zleceń (najstarsze usuwane)
+
+# --- WCZYTYWANIE PLIKÓW ---
+def read_documents(files):
+    # files: lista (nazwa, bajty); archiwa ZIP są rozpakowywane w pamięci
+    for name, data in files:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for entry in archive.infolist():
+                    if not entry.is_dir() and entry.filename.lower().endswith(TEXT_EXTENSIONS):
+                        yield f"{name}/{entry.filename}", archive.read(entry).decode('utf-8', errors='replace')
+        else:
+            yield name, data.decode('utf-8', errors='replace')
+
+# --- WORKER ---
+_analyzer = None
+
+def init_worker(classifier_path, grammar_model, batch_size, threads):
+    # Zmienne BLAS/OpenMP ustawia BatchRunner przed utworzeniem puli - tutaj numpy jest już zaimportowane
+    global _analyzer
+    set_torch_threads(threads)
+    _analyzer = EventAnalyzer(classifier_path=classifier_path, grammar_model=grammar_model, batch_size=batch_size)
+
+def analyze_documents(documents):
+    # documents: lista (indeks, tekst); wynik: lista (indeks, rekordy) w tej samej kolejności.
+    # Długie pliki fragmentami (limit max_length, ograniczona pamięć), krótkie razem w jednej paczce.
+    records = [[] for _ in documents]
+    short = [i for i, (_, text) in enumerate(documents) if len(text) <= LONG_CHUNK_CHARS]
+    for record in _analyzer.analyze_many(documents[i][1] for i in short):
+        records[short[record.pop("doc_index")]].append(record)
+    for i, (_, text) in enumerate(documents):
+        if len(text) > LONG_CHUNK_CHARS:
+            records[i].extend(_analyzer.analyze_long(text))
+    return [(doc_index, doc_records) for (doc_index, _), doc_records in zip(documents, records)]
+
+# --- ZADANIE WSADOWE ---
+class BatchJob:
+    # Stan jednego zlecenia - aktualizowany przez wątek w tle, czytany przez UI przy każdym odświeżeniu
+    def __init__(self, names, keys):
+        self.id = uuid.uuid4().hex
+        self.names = names
+        self.keys = keys                # unikalny klucz dokumentu (nazwa + skrót treści) dla bazy zdarzeń
+        self.lock = threading.Lock()
+        self.results = ResultStore(with_source=True)
+        self.doc_stats = {}             # indeks dokumentu -> {"Zdania": n, kategoria: liczba, ...}
+        self.doc_rows = {}              # indeks dokumentu -> (początek, koniec) wierszy w results
+        self.errors = []
+        self.started = time.time()
+        self.finished = None
+
+    @property
+    def total(self):
+        return len(self.names)
+
+    @property
+    def done(self):
+        with self.lock:
+            return len(self.doc_stats)
+
+    @property
+    def running(self):
+        return self.finished is None
+
+    def add(self, doc_index, records):
+        with self.lock:
+            self.doc_rows[doc_index] = (len(self.results), len(self.results) + len(records))
+            stats = {"Zdania": len(records), **{label: 0 for label in CATEGORIES}}
+            for record in records:
+                self.results.append(record, source=self.names[doc_index])
+                stats[record["label"]] += 1
+            self.doc_stats[doc_index] = stats
+
+    def fail(self, doc_indices, error):
+        with self.lock:
+            for doc_index in doc_indices:
+                self.doc_stats[doc_index] = {"Zdania": 0, **{label: 0 for label in CATEGORIES}}
+                self.errors.append((self.names[doc_index], str(error)))
+
+    def label_counts(self):
+        with self.lock:
+            return self.results.label_counts()
+
+    def documents(self):
+        # (klucz dokumentu, rekordy) - kopia pod blokadą; zapis do bazy zdarzeń już bez niej,
+        # żeby nie wstrzymywać wątku dopisującego wyniki
+        with self.lock:
+            return [
+                (self.keys[doc_index], [self.results.record(i) for i in range(start, end)])
+                for doc_index, (start, end) in sorted(self.doc_rows.items())
+            ]
+
+    def export_file(self, fmt):
+        with self.lock:
+            return self.results.export_file(fmt)
+
+    def document_table(self):
+        with self.lock:
+            return [{"Dokument": self.names[i], **stats} for i, stats in sorted(self.doc_stats.items())]
+
+# --- PULA W TLE ---
+class BatchRunner:
+    # Jedna pula procesów na proces aplikacji; zlecenia przeżywają przeładowania skryptu Streamlit.
+    # Zakończone zlecenia są usuwane po JOB_TTL albo ponad MAX_FINISHED_JOBS, a zapisane w bazie - od razu.
+    def __init__(self, workers=BATCH_WORKERS, threads=THREADS_PER_WORKER,
+                 classifier_path=CLASSIFIER_PATH, grammar_model=GRAMMAR_MODEL, batch_size=CAT_BATCH_SIZE):
+        self.workers = workers
+        self.initargs = (classifier_path, grammar_model, batch_size, threads)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.pool = self._new_pool()
+
+    def _new_pool(self):
+        # Procesy "spawn" dziedziczą os.environ - limit wątków BLAS musi być ustawiony przed ich startem
+        set_child_threads(self.initargs[3])
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=self.initargs
+        )
+
+    def _rebuild(self, broken):
+        # Pad workera (np. OOM na dużym pliku) psuje całą pulę - tworzymy nową zamiast
+        # kończyć błędem wszystkie kolejne zlecenia; robi to tylko pierwszy wątek, który to zauważy
+        with self.lock:
+            if self.pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.pool = self._new_pool()
+
+    def _submit(self, documents):
+        # Zwraca (future, pula), żeby przy błędzie wiedzieć, którą pulę odbudować
+        pool = self.pool
+        try:
+            return pool.submit(analyze_documents, documents), pool
+        except BrokenProcessPool:
+            self._rebuild(pool)
+            pool = self.pool
+            return pool.submit(analyze_documents, documents), pool
+
+    def submit(self, documents):
+        # documents: lista (nazwa, tekst); zwraca BatchJob, przetwarzanie w wątku w tle
+        # Ta sama nazwa może wystąpić w kilku wgranych plikach/archiwach - klucz zawiera skrót treści
+        keys = [f"{name}#{hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]}" for name, text in documents]
+        job = BatchJob([name for name, _ in documents], keys)
+        with self.lock:
+            self._evict()
+            self.jobs[job.id] = job
+        threading.Thread(target=self._run, args=(job, [text for _, text in documents]), daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            self._evict()
+            return self.jobs.get(job_id)
+
+    def discard(self, job_id):
+        # Wyniki zapisane w bazie zdarzeń nie muszą już zajmować pamięci
+        with self.lock:
+            self.jobs.pop(job_id, None)
+
+    def _evict(self):
+        # Wywoływać pod self.lock; zlecenia w toku nie są usuwane
+        finished = sorted((job for job in self.jobs.values() if job.finished is not None), key=lambda job: job.finished)
+        now = time.time()
+        for i, job in enumerate(finished):
+            if now - job.finished > JOB_TTL or i < len(finished) - MAX_FINISHED_JOBS:
+                del self.jobs[job.id]
+
+    def _run(self, job, texts):
+        tasks = iter(enumerate(texts))
+        pending = {}        # future -> (indeksy dokumentów, pula, czy uruchomiony w izolacji)
+        suspects = deque()  # dokumenty z zadań przerwanych padem puli - sprawca nieznany
+        max_pending = self.workers * MAX_PENDING_PER_WORKER
+        try:
+            while True:
+                if suspects:
+                    # Podejrzane dokumenty po jednym, bez innych zadań w locie: kolejny pad wskazuje sprawcę
+                    if not pending:
+                        doc_index = suspects.popleft()
+                        future, pool = self._submit([(doc_index, texts[doc_index])])
+                        pending[future] = ([doc_index], pool, True)
+                else:
+                    # Ograniczona liczba zadań w locie - teksty nie są kopiowane do kolejki puli naraz
+                    while len(pending) < max_pending:
+                        documents = list(itertools.islice(tasks, DOCS_PER_TASK))
+                        if not documents:
+                            break
+                        future, pool = self._submit(documents)
+                        pending[future] = ([i for i, _ in documents], pool, False)
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    doc_indices, pool, isolated = pending.pop(future)
+                    try:
+                        for doc_index, records in future.result():
+                            job.add(doc_index, records)
+                    except BrokenProcessPool as e:
+                        self._rebuild(pool)
+                        if isolated:
+                            job.fail(doc_indices, e)
+                        else:
+                            suspects.extend(doc_indices)
+                    except Exception as e:
+                        if len(doc_indices) == 1:
+                            job.fail(doc_indices, e)
+                            continue
+                        # Błąd w paczce - ponowienie dokument po dokumencie, żeby oznaczyć tylko wadliwy
+                        for doc_index in doc_indices:
+                            retry, retry_pool = self._submit([(doc_index, texts[doc_index])])
+                            pending[retry] = ([doc_index], retry_pool, False)
+        except Exception as e:
+            # Np. uszkodzona pula procesów - zlecenie kończy się z błędem zamiast wisieć
+            with job.lock:
+                job.errors.append(("(zlecenie)", str(e)))
+        finally:
+            job.finished = time.time()
@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import load_grammar_model
+from extraction import EventExtractor
+
+# --- KONFIGURACJA ---
+# Uruchamiać z katalogu głównego repozytorium: python benchmarks/bench_extraction.py
+GOLDEN_FILES = ["data/test_dataset.json", "data/input_data.json"]
+GOLDEN_LIMIT = 5000     # maksymalna liczba zdań w zbiorze wzorcowym
+REPEATS = 5
+
+# --- WZORCOWA (DOTYCHCZASOWA) IMPLEMENTACJA ---
+def extract_details_legacy(doc):
+    data = {"TRIGGER": "-", "KTO": "-", "CO": "-", "GDZIE": "-", "KIEDY": "-"}
+    try:
+        root = [token for token in doc if token.dep_ == "ROOT"][0]
+        data["TRIGGER"] = root.lemma_
+    except IndexError:
+        return data
+
+    for child in root.children:
+        subtree_text = " ".join([t.text for t in child.subtree])
+        if child.dep_ == "nsubj":
+            data["KTO"] = subtree_text
+        elif child.dep_ in ["obj", "nsubj:pass"]:
+            data["CO"] = subtree_text
+        elif child.dep_ == "obl":
+            ents_labels = [e.ent_type_ for e in child.subtree if e.ent_type_]
+            if any(l in ["placeName", "geogName", "GPE", "LOC"] for l in ents_labels):
+                data["GDZIE"] = subtree_text
+            elif any(l in ["date", "time"] for l in ents_labels) or any(w in subtree_text for w in ["wczoraj", "dziś", "jutro", "roku"]):
+                data["KIEDY"] = subtree_text
+            elif " w " in " "+subtree_text or " na " in " "+subtree_text:
+                if data["GDZIE"] == "-": data["GDZIE"] = subtree_text
+
+    for ent in doc.ents:
+        if ent.label_ in ["placeName", "geogName", "GPE", "LOC"] and data["GDZIE"] == "-":
+            data["GDZIE"] = ent.text
+        if ent.label_ in ["date", "time"] and data["KIEDY"] == "-":
+            data["KIEDY"] = ent.text
+    return data
+
+def load_sentences():
+    sentences = []
+    for path in GOLDEN_FILES:
+        with open(path, 'r', encoding='utf-8') as f:
+            sentences.extend(item["Zdanie"] for item in json.load(f))
+    return sentences[:GOLDEN_LIMIT]
+
+def best_time(fn, docs):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for doc in docs:
+            fn(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    nlp_gram = load_grammar_model()
+    docs = list(nlp_gram.pipe(load_sentences(), batch_size=256))
+    extractor = EventExtractor(nlp_gram.vocab)
+
+    # --- ZGODNOŚĆ ZE ZBIOREM WZORCOWYM ---
+    mismatches = 0
+    for doc in docs:
+        expected, actual = extract_details_legacy(doc), extractor(doc)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"RÓŻNICA: {doc.text}\n  wzorzec: {expected}\n  nowy:    {actual}")
+    print(f"Zgodność: {len(docs) - mismatches}/{len(docs)}")
+
+    # --- ZGODNOŚĆ OKROJONEGO MODELU (GRAMMAR_COMPONENTS) Z PEŁNYM POTOKIEM ---
+    nlp_full = load_grammar_model(components=None)
+    full_extractor = EventExtractor(nlp_full.vocab)
+    texts = [doc.text for doc in docs]
+    slim_mismatches = 0
+    for doc, doc_full in zip(docs, nlp_full.pipe(texts, batch_size=256)):
+        if extractor(doc) != full_extractor(doc_full):
+            slim_mismatches += 1
+    print(f"Okrojony potok ({', '.join(nlp_gram.pipe_names)}) vs pełny: {len(docs) - slim_mismatches}/{len(docs)}")
+    mismatches += slim_mismatches
+
+    # --- MIKRO-BENCHMARK ---
+    t_legacy = best_time(extract_details_legacy, docs)
+    t_new = best_time(extractor, docs)
+    print(f"Dotychczas:   {t_legacy / len(docs) * 1e6:8.1f} µs/zdanie")
+    print(f"EventExtractor: {t_new / len(docs) * 1e6:6.1f} µs/zdanie ({t_legacy / t_new:.2f}x)")
+
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import EventAnalyzer
+
+# --- KONFIGURACJA ---
+# Uruchamiać z katalogu głównego repozytorium: python benchmarks/bench_long_document.py
+FILE_SENTENCES = "data/test_dataset.json"
+DOCUMENT_CHARS = [200_000, 1_000_000, 3_000_000]    # rozmiary sztucznych raportów
+SENTENCES_PER_PARAGRAPH = 6
+
+def build_document(sentences, size):
+    paragraphs, length, i = [], 0, 0
+    while length < size:
+        paragraph = " ".join(sentences[(i + k) % len(sentences)] for k in range(SENTENCES_PER_PARAGRAPH))
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+        i += SENTENCES_PER_PARAGRAPH
+    return "\n\n".join(paragraphs)
+
+def measure(records):
+    # Czas do pierwszego wyniku, czas całkowity i szczyt alokacji Pythona w trakcie
+    tracemalloc.start()
+    start = time.perf_counter()
+    first, count = None, 0
+    try:
+        for _ in records:
+            count += 1
+            if first is None:
+                first = time.perf_counter() - start
+    except ValueError as e:
+        # spaCy odrzuca teksty dłuższe niż nlp.max_length
+        tracemalloc.stop()
+        return None, None, None, str(e).split("\n")[0][:60]
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return first, total, peak, f"{count} zdań"
+
+def main():
+    with open(FILE_SENTENCES, 'r', encoding='utf-8') as f:
+        sentences = [item["Zdanie"].rstrip(".") + "." for item in json.load(f)]
+
+    analyzer = EventAnalyzer()
+    list(analyzer.analyze(" ".join(sentences[:20])))
+
+    print(f"{'Znaki':>10} | {'Tryb':>10} | {'Pierwszy wynik [s]':>18} | {'Razem [s]':>9} | {'Szczyt [MB]':>11} | Wynik")
+    for size in DOCUMENT_CHARS:
+        document = build_document(sentences, size)
+        for name, method in (("całość", analyzer.analyze), ("fragmenty", analyzer.analyze_long)):
+            # Bez cache - oba tryby liczą wszystko od nowa
+            analyzer.cache = None
+            first, total, peak, note = measure(method(document))
+            if first is None:
+                print(f"{len(document):>10} | {name:>10} | {'-':>18} | {'-':>9} | {'-':>11} | {note}")
+            else:
+                print(f"{len(document):>10} | {name:>10} | {first:>18.3f} | {total:>9.2f} | {peak:>11.1f} | {note}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "code")]
+from engine import (
+    load_classifier_model, current_rss_mb, peak_rss_mb, set_child_threads, set_torch_threads,
+    CLASSIFIER_PATH, QUANTIZE_MARKER
+)
+from balanced_corpus import load_docs, resolve_docbin_path
+
+# --- KONFIGURACJA ---
+# Uruchamiać z katalogu głównego repozytorium: python benchmarks/bench_quantization.py
+FILE_TEST = "data/shards/test"      # katalog z plikami .spacy (albo pojedynczy plik)
+FILE_TEST_FALLBACK = "data/data_test.spacy"     # pojedynczy plik ze starszej wersji data_preparation.py
+EVAL_BATCH_SIZE = 64
+LATENCY_SAMPLES = 300               # liczba zdań do pomiaru opóźnienia pojedynczego zdania
+THREADS = 1                         # jak na jednym workerze serwującym
+MAX_ACCURACY_LOSS = 0.005           # dopuszczalny spadek accuracy przy zapisie znacznika
+WRITE_MARKER = False                # True = zapisz QUANTIZE_MARKER w katalogu modelu, jeśli spadek jest w limicie
+
+# --- POMIAR JEDNEGO WARIANTU (W OSOBNYM PROCESIE) ---
+def measure(quantize, test_path):
+    # Zmienne BLAS/OpenMP ustawia main() przed startem procesu - tutaj numpy jest już zaimportowane
+    set_torch_threads(THREADS)
+    from spacy.tokens import Doc
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    nlp = load_classifier_model(CLASSIFIER_PATH, quantize=quantize)
+    load_time = time.perf_counter() - start
+    # Pamięć trzymana przez załadowany model (po zwolnieniu wag fp32 podmienionych przy kwantyzacji);
+    # szczytowe RSS jest w obu wariantach takie samo - int8 powstaje z załadowanego modelu fp32
+    gc.collect()
+    model_rss = current_rss_mb() - rss_before
+
+    gold_docs = load_docs(test_path, nlp.vocab)
+    inputs = [Doc(nlp.vocab, words=[t.text for t in doc], spaces=[bool(t.whitespace_) for t in doc]) for doc in gold_docs]
+
+    start = time.perf_counter()
+    pred_docs = list(nlp.pipe(inputs, batch_size=EVAL_BATCH_SIZE))
+    pipe_time = time.perf_counter() - start
+
+    latencies = []
+    for doc in inputs[:LATENCY_SAMPLES]:
+        start = time.perf_counter()
+        nlp(Doc(nlp.vocab, words=[t.text for t in doc], spaces=[bool(t.whitespace_) for t in doc]))
+        latencies.append(time.perf_counter() - start)
+
+    predicted = [max(doc.cats, key=doc.cats.get) for doc in pred_docs]
+    gold = [max(doc.cats, key=doc.cats.get) for doc in gold_docs]
+    return {
+        "predicted": predicted,
+        "accuracy": float(np.mean([p == g for p, g in zip(predicted, gold)])),
+        "load_time": load_time,
+        "docs_per_s": len(pred_docs) / pipe_time if pipe_time > 0 else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "model_rss_mb": model_rss,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def main():
+    test_path = resolve_docbin_path(FILE_TEST, FILE_TEST_FALLBACK)
+    if not os.path.exists(CLASSIFIER_PATH) or test_path is None:
+        print(f"Brak modelu ({CLASSIFIER_PATH}) albo danych testowych ({FILE_TEST} ani {FILE_TEST_FALLBACK}) "
+              f"- uruchom najpierw code/data_preparation.py")
+        return
+    print(f"Dane testowe: {test_path}")
+
+    # Każdy wariant w świeżym procesie, żeby pomiary pamięci dotyczyły tylko jego;
+    # ten sam limit wątków BLAS dla fp32 i int8 (dziedziczony przez proces "spawn")
+    set_child_threads(THREADS)
+    results = {}
+    for name, quantize in (("fp32", False), ("int8", True)):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            print(f"Pomiar: {name}...")
+            results[name] = pool.submit(measure, quantize, test_path).result()
+
+    fp32, int8 = results["fp32"], results["int8"]
+    agreement = np.mean([a == b for a, b in zip(fp32["predicted"], int8["predicted"])])
+    accuracy_delta = int8["accuracy"] - fp32["accuracy"]
+
+    print(f"\n{'Wariant':>8} | {'Accuracy':>8} | {'Ładowanie [s]':>13} | {'Docs/s':>8} | {'p50 [ms]':>8} | {'p95 [ms]':>8} | {'Model [MB]':>10} | {'Peak RSS [MB]':>13}")
+    for name, r in results.items():
+        print(f"{name:>8} | {r['accuracy']:>8.2%} | {r['load_time']:>13.2f} | {r['docs_per_s']:>8.0f} | "
+              f"{r['p50_ms']:>8.2f} | {r['p95_ms']:>8.2f} | {r['model_rss_mb']:>10.0f} | {r['peak_rss_mb']:>13.0f}")
+
+    print(f"\nZmiana accuracy: {accuracy_delta:+.2%} (zgodność etykiet {agreement:.2%})")
+    print(f"Przyspieszenie: przepustowość {int8['docs_per_s'] / fp32['docs_per_s']:.2f}x, "
+          f"p50 {fp32['p50_ms'] / int8['p50_ms']:.2f}x")
+    print(f"Oszczędność pamięci po załadowaniu: {fp32['model_rss_mb'] - int8['model_rss_mb']:.0f} MB na proces "
+          f"(szczyt przy ładowaniu bez zmian)")
+
+    if WRITE_MARKER:
+        marker_path = os.path.join(CLASSIFIER_PATH, QUANTIZE_MARKER)
+        if -accuracy_delta <= MAX_ACCURACY_LOSS:
+            with open(marker_path, 'w', encoding='utf-8') as f:
+                json.dump({"dtype": "qint8", "accuracy_delta": accuracy_delta}, f, indent=4)
+            print(f"Zapisano znacznik: {marker_path}")
+        else:
+            print(f"Spadek accuracy powyżej {MAX_ACCURACY_LOSS:.2%} - znacznik nie został zapisany")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import EventAnalyzer, MIN_SENTENCE_LENGTH
+from extraction import extract_details
+
+# --- KONFIGURACJA ---
+# Uruchamiać z katalogu głównego repozytorium: python benchmarks/bench_single_parse.py
+FILE_SENTENCES = "data/test_dataset.json"
+ARTICLE_SIZES = [300, 1000, 2000]   # liczba zdań w sztucznym "artykule"
+REPEATS = 3
+
+# --- DOTYCHCZASOWA ŚCIEŻKA (TEKST -> PONOWNA TOKENIZACJA, as_doc) ---
+def analyze_legacy(analyzer, text):
+    doc_whole = analyzer.nlp_gram(text)
+    candidates = []
+    for sent in doc_whole.sents:
+        sent_text = sent.text.strip()
+        if len(sent_text) < MIN_SENTENCE_LENGTH: continue
+        candidates.append((sent, sent_text))
+
+    docs_cat = analyzer.nlp_cat.pipe((t for _, t in candidates), batch_size=analyzer.batch_size)
+    results = []
+    for (sent, sent_text), doc_cat in zip(candidates, docs_cat):
+        scores = doc_cat.cats
+        best_label = max(scores, key=scores.get)
+        results.append((sent_text, best_label, extract_details(sent.as_doc())))
+    return results
+
+def analyze_single_parse(analyzer, text):
+    return [(r["text"], r["label"], r["details"]) for r in analyzer.analyze(text)]
+
+def best_time(fn, *args):
+    best, result = float("inf"), None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    with open(FILE_SENTENCES, 'r', encoding='utf-8') as f:
+        sentences = [item["Zdanie"].rstrip(".") + "." for item in json.load(f)]
+
+    analyzer = EventAnalyzer()
+    # Rozgrzewka obu ścieżek
+    analyze_legacy(analyzer, " ".join(sentences[:20]))
+    analyze_single_parse(analyzer, " ".join(sentences[:20]))
+
+    print(f"{'Zdania':>8} | {'Dotychczas [s]':>14} | {'Jedno parsowanie [s]':>20} | {'Przyspieszenie':>14} | Zgodność")
+    for size in ARTICLE_SIZES:
+        article = " ".join((sentences * (size // len(sentences) + 1))[:size])
+        t_legacy, r_legacy = best_time(analyze_legacy, analyzer, article)
+        t_single, r_single = best_time(analyze_single_parse, analyzer, article)
+        same_labels = [r[1] for r in r_legacy] == [r[1] for r in r_single]
+        same_details = [r[2] for r in r_legacy] == [r[2] for r in r_single]
+        print(f"{size:>8} | {t_legacy:>14.3f} | {t_single:>20.3f} | {t_legacy / t_single:>13.2f}x | "
+              f"etykiety={'tak' if same_labels else 'NIE'}, szczegóły={'tak' if same_details else 'NIE'}")
+
+if __name__ == "__main__":
+    main()
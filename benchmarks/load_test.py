@@ -0,0 +1,93 @@
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# --- KONFIGURACJA ---
+# Uruchamiać z katalogu głównego repozytorium przy działającym serwerze:
+#   python server.py & python benchmarks/load_test.py --clients 32 --requests 2000
+FILE_SENTENCES = "data/test_dataset.json"
+URL = "http://127.0.0.1:8000"
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def post(url, payload, timeout=60):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+        headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return "błąd połączenia"
+
+def main():
+    parser = argparse.ArgumentParser(description="Test obciążeniowy serwera (server.py)")
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--endpoint", choices=["classify", "analyze"], default="classify")
+    parser.add_argument("--clients", type=int, default=16, help="liczba równoległych klientów")
+    parser.add_argument("--requests", type=int, default=1000, help="łączna liczba żądań")
+    parser.add_argument("--sentences", type=int, default=1, help="zdań w jednym żądaniu")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with open(FILE_SENTENCES, 'r', encoding='utf-8') as f:
+        sentences = [item["Zdanie"] for item in json.load(f)]
+
+    rng = random.Random(args.seed)
+    payloads = []
+    for _ in range(args.requests):
+        sample = rng.sample(sentences, args.sentences)
+        if args.endpoint == "classify":
+            payloads.append({"sentences": sample})
+        else:
+            payloads.append({"text": " ".join(s.rstrip(".") + "." for s in sample)})
+
+    url = f"{args.url}/{args.endpoint}"
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def call(payload):
+        start = time.perf_counter()
+        status = post(url, payload)
+        elapsed = time.perf_counter() - start
+        with lock:
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    print(f"{args.requests} żądań do {url}, {args.clients} klientów, {args.sentences} zdań na żądanie")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(call, payloads))
+    total = time.perf_counter() - start
+
+    # --- WYNIKI ---
+    print(f"\nCzas: {total:.2f} s, przepustowość: {len(latencies) / total:.1f} żądań/s, "
+          f"{len(latencies) * args.sentences / total:.1f} zdań/s")
+    print(f"Statusy: {dict(statuses)}")
+    if latencies:
+        p50, p95, p99 = (percentile(latencies, q) * 1000 for q in (50, 95, 99))
+        print(f"Opóźnienie [ms]: p50 {p50:.1f}, p95 {p95:.1f}, p99 {p99:.1f}")
+
+    try:
+        with urllib.request.urlopen(f"{args.url}/metrics", timeout=10) as response:
+            print("\nMetryki serwera:")
+            print(json.dumps(json.loads(response.read()), indent=4, ensure_ascii=False))
+    except OSError as e:
+        print(f"Nie udało się pobrać /metrics: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import random
+from collections import defaultdict
+from pathlib import Path
+
+import spacy
+from spacy.tokens import DocBin
+from spacy.training import Example
+
+# --- CZYTNIK KORPUSU Z BALANSOWANIEM KLAS ---
+# Zamiast fizycznie powielać przykłady klas mniejszościowych w DocBin, każda epoka
+# losuje przykłady z wagą odwrotnie proporcjonalną do liczności klasy.
+# Na dysku i w pamięci są tylko unikalne przykłady; powtórzenia to te same obiekty Example.
+#
+# Użycie w configu (wymaga [training] max_epochs = -1, żeby czytnik był wołany co epokę):
+#   [corpora.train]
+#   @readers = "event.BalancedCorpus.v1"
+#   path = ${paths.train}
+#   seed = ${system.seed}
+#   epoch_size = 0
+#
+# Rejestracja: import tego modułu przed treningiem (models_training.py) albo
+#   python -m spacy train config.cfg --code balanced_corpus.py
+
+@spacy.registry.readers("event.BalancedCorpus.v1")
+def create_balanced_corpus(path, seed=0, epoch_size=0, max_length=0, limit=0):
+    return BalancedCorpus(path, seed=seed, epoch_size=epoch_size, max_length=max_length, limit=limit)
+
+def walk_spacy_files(path):
+    path = Path(path)
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*.spacy"))
+    return [path]
+
+# --- WSPÓLNE NARZĘDZIA DOCBIN (ewaluacja, strojenie kaskady, benchmarki) ---
+def resolve_docbin_path(path, fallback):
+    # Katalog shardów z data_preparation.py, a gdy go nie ma - pojedynczy plik .spacy; None, gdy brak obu
+    if os.path.isfile(path) or (os.path.isdir(path) and walk_spacy_files(path)):
+        return path
+    if os.path.isfile(fallback):
+        return fallback
+    return None
+
+def load_docs(path, vocab):
+    docs = []
+    for file_path in walk_spacy_files(path):
+        docs.extend(DocBin().from_disk(file_path).get_docs(vocab))
+    return docs
+
+class BalancedCorpus:
+    def __init__(self, path, seed=0, epoch_size=0, max_length=0, limit=0):
+        self.path = path
+        self.seed = seed
+        self.epoch_size = epoch_size    # 0 = liczba klas x liczność największej klasy
+        self.max_length = max_length
+        self.limit = limit
+        self.epoch = 0
+        self._vocab = None
+        self._groups = None
+
+    def _load(self, nlp):
+        # Przykłady wczytywane raz na proces i współdzielone między epokami
+        groups = defaultdict(list)
+        count = 0
+        for file_path in walk_spacy_files(self.path):
+            for reference in DocBin().from_disk(file_path).get_docs(nlp.vocab):
+                if self.max_length and len(reference) > self.max_length:
+                    continue
+                label = max(reference.cats, key=reference.cats.get) if reference.cats else None
+                groups[label].append(Example(nlp.make_doc(reference.text), reference))
+                count += 1
+                if self.limit and count >= self.limit:
+                    break
+            if self.limit and count >= self.limit:
+                break
+        self._vocab = nlp.vocab
+        self._groups = {label: examples for label, examples in groups.items()}
+
+    def __call__(self, nlp):
+        if self._groups is None or self._vocab is not nlp.vocab:
+            self._load(nlp)
+        if not self._groups:
+            return
+
+        labels = sorted(self._groups, key=str)
+        size = self.epoch_size or len(labels) * max(len(examples) for examples in self._groups.values())
+
+        # Losowanie: najpierw klasa (równomiernie), potem przykład w klasie
+        rng = random.Random(self.seed + self.epoch)
+        self.epoch += 1
+        for _ in range(size):
+            examples = self._groups[rng.choice(labels)]
+            yield examples[rng.randrange(len(examples))]
@@ -0,0 +1,88 @@
+import spacy
+import json
+import os
+import numpy as np
+from spacy.tokens import Doc
+
+from balanced_corpus import load_docs, resolve_docbin_path
+
+# --- KONFIGURACJA ---
+FAST_MODEL = "../models/output_light/model-best"     # szybki pierwszy etap
+FULL_MODEL = "../models/output_herbert/model-best"   # HerBERT - etap dla niepewnych zdań
+FILE_DEV = "../data/shards/dev"                      # katalog z plikami .spacy (albo pojedynczy plik)
+FILE_DEV_FALLBACK = "../data/data_dev.spacy"         # pojedynczy plik ze starszej wersji data_preparation.py
+OUTPUT_FILE = "../models/cascade.json"               # czytany przez engine.load_cascade_config
+
+# --- PARAMETRY STROJENIA ---
+MAX_ACCURACY_LOSS = 0.005   # dopuszczalny spadek accuracy względem samego HerBERTa
+EVAL_BATCH_SIZE = 256
+MARGIN_STEPS = 101          # progi 0.00, 0.01, ..., 1.00
+
+def predict(nlp, gold_docs, labels):
+    # Macierz wyników [zdania x etykiety] w kolejności labels
+    inputs = (Doc(nlp.vocab, words=[t.text for t in doc], spaces=[bool(t.whitespace_) for t in doc]) for doc in gold_docs)
+    return np.array([[doc.cats.get(label, 0.0) for label in labels] for doc in nlp.pipe(inputs, batch_size=EVAL_BATCH_SIZE)])
+
+def main():
+    for path in (FAST_MODEL, FULL_MODEL):
+        if not os.path.exists(path):
+            print(f"Brak: {path}")
+            return
+    dev_path = resolve_docbin_path(FILE_DEV, FILE_DEV_FALLBACK)
+    if dev_path is None:
+        print(f"Brak danych walidacyjnych ({FILE_DEV} ani {FILE_DEV_FALLBACK}) - uruchom najpierw data_preparation.py")
+        return
+
+    # --- PREDYKCJE OBU ETAPÓW (RAZ) ---
+    print("Wczytywanie modeli...")
+    nlp_fast = spacy.load(FAST_MODEL)
+    nlp_full = spacy.load(FULL_MODEL)
+
+    gold_docs = load_docs(dev_path, nlp_full.vocab)
+    labels = sorted(gold_docs[0].cats)
+    gold = np.array([[doc.cats.get(label, 0.0) for label in labels] for doc in gold_docs]).argmax(axis=1)
+    print(f"Zdania walidacyjne: {len(gold_docs)}")
+
+    print("Predykcje szybkiego modelu...")
+    fast = predict(nlp_fast, gold_docs, labels)
+    print("Predykcje HerBERTa...")
+    full = predict(nlp_full, gold_docs, labels)
+
+    top2 = np.sort(fast, axis=1)[:, -2:]
+    margins = top2[:, 1] - top2[:, 0]
+    fast_correct = fast.argmax(axis=1) == gold
+    full_correct = full.argmax(axis=1) == gold
+
+    full_accuracy = full_correct.mean()
+    target = full_accuracy - MAX_ACCURACY_LOSS
+
+    # --- PRZEGLĄD PROGÓW ---
+    # Próg rośnie -> więcej eskalacji -> accuracy dąży do accuracy HerBERTa
+    print(f"\nAccuracy: szybki {fast_correct.mean():.2%}, HerBERT {full_accuracy:.2%}, cel >= {target:.2%}")
+    print(f"{'Próg':>6} {'Eskalacja':>10} {'Accuracy':>9}")
+    chosen = None
+    for margin in np.linspace(0.0, 1.0, MARGIN_STEPS):
+        escalated = margins < margin
+        accuracy = np.where(escalated, full_correct, fast_correct).mean()
+        if chosen is None and accuracy >= target:
+            chosen = {"margin": round(float(margin), 4), "accuracy": float(accuracy), "escalation_rate": float(escalated.mean())}
+        if int(round(margin * 100)) % 10 == 0:
+            print(f"{margin:>6.2f} {escalated.mean():>10.1%} {accuracy:>9.2%}")
+
+    if chosen is None:
+        print("\nŻaden próg nie spełnia celu - kaskada nie zostanie włączona.")
+        return
+
+    chosen.update({
+        "fast_model": FAST_MODEL.replace("../", "", 1),
+        "full_accuracy": float(full_accuracy),
+        "max_accuracy_loss": MAX_ACCURACY_LOSS
+    })
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(chosen, f, indent=4)
+
+    print(f"\nWybrany próg: {chosen['margin']} (eskalacja {chosen['escalation_rate']:.1%}, accuracy {chosen['accuracy']:.2%})")
+    print(f"Zapisano: {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
+import argparse
+import copy
 import json
+import os
+import zlib
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.svm import SVC
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier, PassiveAggressiveClassifier
+from sklearn.svm import SVC, LinearSVC
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import precision_recall_fscore_support, accuracy_score
 
@@ -18,75 +22,225 @@ label_map = {
     "WYPADEK": 5
 }
 
-# --- WCZYTYWANIE DANYCH ---
-print("Wczytywanie i przygotowanie danych...")
-try:
-    with open('../data/train_dataset.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-except FileNotFoundError:
-    print("Brak pliku train_dataset.json")
-    exit()
-
-df = pd.DataFrame(data)
-df['label_id'] = df['Etykieta'].map(label_map)
-df = df.dropna(subset=['label_id'])
-df['label_id'] = df['label_id'].astype(int)
-
-X = df['Zdanie'].values
-y = df['label_id'].values
-
-# --- PODZIAŁ ---
-X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.1, stratify=y, random_state=42)
-X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, stratify=y_temp, random_state=42)
-
-# --- WEKTORYZACJA ---
-print("Zamiana tekstu na liczby")
-vectorizer = TfidfVectorizer(max_features=5000)
-X_train_vec = vectorizer.fit_transform(X_train)
-X_test_vec = vectorizer.transform(X_test) 
-
-# --- DEFINICJA MODELI KLASYCZNYCH ---
-models = {
-    "7. Logistic Regression": LogisticRegression(max_iter=1000, class_weight='balanced'),
-    "8. SVM (Linear)": SVC(kernel='linear', class_weight='balanced'),
-    "9. Random Forest": RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=42)
-}
+FILE_DATASET = "../data/train_dataset.json"
+
+# --- TRYB TRENINGU ---
+STREAMING = False           # True = trening strumieniowy (partial_fit), bez wczytywania całości do pamięci (albo --stream)
+# LinearSVC (squared hinge, one-vs-rest, liblinear) zamiast SVC(kernel='linear') (hinge, one-vs-one, libsvm):
+# dużo szybszy trening, ale to inny model - wyniki nie są porównywalne z dotychczasowym punktem odniesienia
+USE_LINEAR_SVC = False
 
-results = []
-
-# --- TRENOWANIE ---
-print("\n--- ROZPOCZYNAM TRENING MODELI KLASYCZNYCH ---")
-for name, model in models.items():
-    print(f"Trenowanie: {name}...")
-    
-    model.fit(X_train_vec, y_train)
-    
-    y_pred = model.predict(X_test_vec)
-    
-    precision, recall, f1, _ = precision_recall_fscore_support(y_test, y_pred, average='macro', zero_division=0)
-    accuracy = accuracy_score(y_test, y_pred)
-    
-    results.append({
+# --- PARAMETRY TRYBU STRUMIENIOWEGO ---
+# Pełny korpus oznaczony przez data_classification.py (FILE_CLASSIFIED), a nie próbka train_dataset.json.
+# Tablica JSON czytana strumieniowo wymaga pakietu ijson (pip install ijson); plik .jsonl - nie.
+STREAM_FILE = "../data/classified_data.json"
+CHUNK_SIZE = 10000
+N_EPOCHS = 3
+SEED = 42                   # kolejność zdań w kawałku losowana od nowa w każdej epoce
+HASH_FEATURES = 2 ** 20
+TEST_BUCKETS = (90, 95)     # hash(zdanie) % 100: <90 trening, 90-94 walidacja, >=95 test
+
+# --- WYNIKI ---
+def evaluate(name, y_true, y_pred):
+    precision, recall, f1, _ = precision_recall_fscore_support(y_true, y_pred, average='macro', zero_division=0)
+    accuracy = accuracy_score(y_true, y_pred)
+    return {
         "Model": name,
         "Precision": precision,
         "Recall": recall,
         "F1 Score": f1,
         "Accuracy": accuracy
-    })
-
-# --- WYŚWIETLANIE WYNIKÓW ---
-df_classic = pd.DataFrame(results)
-df_classic = df_classic.sort_values(by="F1 Score", ascending=False)
-
-df_display = df_classic.copy()
-for col in ["Precision", "Recall", "F1 Score", "Accuracy"]:
-    df_display[col] = df_display[col].apply(lambda x: f"{x:.2%}")
-
-print("\n" + "="*60)
-print("WYNIKI ML (Klasyczne)")
-print("="*60)
-try:
-    import tabulate
-    print(df_display.to_markdown(index=False))
-except ImportError:
-    print(df_display.to_string(index=False))
\ No newline at end of file
+    }
+
+def print_results(results, title):
+    df_classic = pd.DataFrame(results)
+    df_classic = df_classic.sort_values(by="F1 Score", ascending=False)
+
+    df_display = df_classic.copy()
+    for col in ["Precision", "Recall", "F1 Score", "Accuracy"]:
+        df_display[col] = df_display[col].apply(lambda x: f"{x:.2%}")
+
+    print("\n" + "="*60)
+    print(title)
+    print("="*60)
+    try:
+        import tabulate
+        print(df_display.to_markdown(index=False))
+    except ImportError:
+        print(df_display.to_string(index=False))
+
+# --- TRYB W PAMIĘCI ---
+def run_in_memory():
+    # --- WCZYTYWANIE DANYCH ---
+    print("Wczytywanie i przygotowanie danych...")
+    try:
+        with open(FILE_DATASET, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print("Brak pliku train_dataset.json")
+        return
+
+    df = pd.DataFrame(data)
+    df['label_id'] = df['Etykieta'].map(label_map)
+    df = df.dropna(subset=['label_id'])
+    df['label_id'] = df['label_id'].astype(int)
+
+    X = df['Zdanie'].values
+    y = df['label_id'].values
+
+    # --- PODZIAŁ ---
+    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.1, stratify=y, random_state=42)
+    X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, stratify=y_temp, random_state=42)
+
+    # --- WEKTORYZACJA ---
+    print("Zamiana tekstu na liczby")
+    vectorizer = TfidfVectorizer(max_features=5000)
+    X_train_vec = vectorizer.fit_transform(X_train)
+    X_test_vec = vectorizer.transform(X_test)
+
+    # --- DEFINICJA MODELI KLASYCZNYCH ---
+    if USE_LINEAR_SVC:
+        svm = LinearSVC(class_weight='balanced')
+    else:
+        svm = SVC(kernel='linear', class_weight='balanced')
+
+    models = {
+        "7. Logistic Regression": LogisticRegression(max_iter=1000, class_weight='balanced'),
+        "8. SVM (Linear)": svm,
+        "9. Random Forest": RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=42)
+    }
+
+    results = []
+
+    # --- TRENOWANIE ---
+    print("\n--- ROZPOCZYNAM TRENING MODELI KLASYCZNYCH ---")
+    for name, model in models.items():
+        print(f"Trenowanie: {name}...")
+
+        model.fit(X_train_vec, y_train)
+
+        y_pred = model.predict(X_test_vec)
+
+        results.append(evaluate(name, y_test, y_pred))
+
+    print_results(results, "WYNIKI ML (Klasyczne)")
+
+# --- TRYB STRUMIENIOWY ---
+def bucket(text):
+    return zlib.crc32(text.encode('utf-8')) % 100
+
+def iter_chunks(path):
+    # Zwraca kawałki (teksty, etykiety) bez wczytywania całego pliku
+    if path.endswith(".jsonl"):
+        for chunk in pd.read_json(path, lines=True, chunksize=CHUNK_SIZE):
+            yield chunk
+    else:
+        try:
+            import ijson
+        except ImportError:
+            raise SystemExit(f"Odczyt strumieniowy {path} wymaga pakietu ijson (pip install ijson) - albo podaj plik .jsonl")
+        rows = []
+        with open(path, 'rb') as f:
+            for item in ijson.items(f, "item"):
+                rows.append(item)
+                if len(rows) >= CHUNK_SIZE:
+                    yield pd.DataFrame(rows)
+                    rows = []
+        if rows:
+            yield pd.DataFrame(rows)
+
+def iter_split(path, split, rng=None):
+    # rng: tasowanie zdań w obrębie kawałka (pełne tasowanie wymagałoby całego pliku w pamięci)
+    low, high = TEST_BUCKETS
+    for chunk in iter_chunks(path):
+        chunk = chunk.assign(label_id=chunk['Etykieta'].map(label_map)).dropna(subset=['label_id'])
+        texts = chunk['Zdanie'].astype(str)
+        buckets = texts.map(bucket)
+        if split == "train":
+            mask = buckets < low
+        elif split == "val":
+            mask = (buckets >= low) & (buckets < high)
+        else:
+            mask = buckets >= high
+        if mask.any():
+            X, y = texts[mask].values, chunk['label_id'][mask].astype(int).values
+            if rng is not None:
+                order = rng.permutation(len(X))
+                X, y = X[order], y[order]
+            yield X, y
+
+def predict_split(path, split, vectorizer, models):
+    y_true = []
+    y_pred = {name: [] for name in models}
+    for X_chunk, y_chunk in iter_split(path, split):
+        X_vec = vectorizer.transform(X_chunk)
+        y_true.append(y_chunk)
+        for name, model in models.items():
+            y_pred[name].append(model.predict(X_vec))
+    if not y_true:
+        return None, None
+    return np.concatenate(y_true), {name: np.concatenate(preds) for name, preds in y_pred.items()}
+
+def run_streaming(path=STREAM_FILE):
+    if not os.path.exists(path):
+        print(f"Brak pliku {path} - uruchom najpierw data_classification.py")
+        return
+    print(f"Trening strumieniowy z {path} (po {CHUNK_SIZE} zdań)")
+    vectorizer = HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False, norm='l2')
+    classes = np.array(sorted(label_map.values()))
+
+    # --- WAGI KLAS (odpowiednik class_weight='balanced') ---
+    counts = np.zeros(len(classes))
+    for _, y_chunk in iter_split(path, "train"):
+        counts += np.bincount(y_chunk, minlength=len(classes))
+    class_weight = counts.sum() / (len(classes) * np.maximum(counts, 1))
+    print(f"Zdania treningowe: {int(counts.sum())}")
+
+    models = {
+        "7s. Logistic Regression (SGD)": SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42),
+        "8s. SVM Linear (SGD)": SGDClassifier(loss='hinge', alpha=1e-5, random_state=42),
+        "10s. Passive Aggressive": PassiveAggressiveClassifier(C=0.1, random_state=42)
+    }
+
+    # --- TRENOWANIE (WSZYSTKIE MODELE NA TYM SAMYM STRUMIENIU) ---
+    # Po każdej epoce ocena na zbiorze walidacyjnym; do testu idzie epoka z najlepszym F1 (osobno dla modelu)
+    print("\n--- ROZPOCZYNAM TRENING STRUMIENIOWY ---")
+    best = {name: (-1.0, None) for name in models}
+    for epoch in range(N_EPOCHS):
+        rng = np.random.default_rng(SEED + epoch)
+        for X_chunk, y_chunk in iter_split(path, "train", rng):
+            X_vec = vectorizer.transform(X_chunk)
+            weights = class_weight[y_chunk]
+            for model in models.values():
+                model.partial_fit(X_vec, y_chunk, classes=classes, sample_weight=weights)
+
+        y_val, val_pred = predict_split(path, "val", vectorizer, models)
+        scores = []
+        for name, model in models.items():
+            f1 = evaluate(name, y_val, val_pred[name])["F1 Score"] if y_val is not None else 0.0
+            if f1 > best[name][0]:
+                best[name] = (f1, copy.deepcopy(model))
+            scores.append(f"{name.split('. ', 1)[-1]} {f1:.2%}")
+        print(f"Epoka {epoch + 1}/{N_EPOCHS} - F1 (walidacja): " + ", ".join(scores))
+
+    # --- OCENA ---
+    best_models = {name: model for name, (_, model) in best.items()}
+    y_true, y_pred = predict_split(path, "test", vectorizer, best_models)
+    if y_true is None:
+        print("Brak zdań testowych")
+        return
+    results = [evaluate(name, y_true, preds) for name, preds in y_pred.items()]
+    print_results(results, "WYNIKI ML (Klasyczne, strumieniowo)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Klasyczne modele ML dla klasyfikacji zdarzeń")
+    parser.add_argument("--stream", nargs="?", const=STREAM_FILE, default=None, metavar="PLIK",
+                        help=f"trening strumieniowy na pełnym korpusie .json/.jsonl (domyślnie {STREAM_FILE})")
+    args = parser.parse_args()
+    if args.stream or STREAMING:
+        run_streaming(args.stream or STREAM_FILE)
+    else:
+        run_in_memory()
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,50 @@ import json
 import os
 import time
 import random
+import asyncio
+import urllib.request
+import urllib.error
+import hashlib
 import typing_extensions as typing
-from collections import Counter
-import google.generativeai as genai
+from collections import Counter, defaultdict
+try:
+    import google.generativeai as genai
+except ImportError:
+    # Potrzebny tylko w trybie synchronicznym - tryb asynchroniczny woła API przez HTTP
+    genai = None
+from label_cache import LabelCache, cache_key
+from deduplication import deduplicate, dedup_settings, print_report, save_report, DEDUP_THRESHOLD
 
 # --- KONFIGURACJA ---
-API_KEY = ""
+API_KEY = os.environ.get("LLM_API_KEY", "")
+API_BASE_URL = os.environ.get("LLM_API_BASE_URL", "https://generativelanguage.googleapis.com")
 
 FILE_RAW_INPUT = "../data/input_data.json"           
 FILE_CLASSIFIED = "../data/classified_data.json"
+FILE_JOURNAL = "../data/classified_data.journal.jsonl"
+FILE_LABEL_CACHE = "../data/label_cache.sqlite"
 FILE_FINAL = "../data/final_dataset.json"
+FILE_DEDUP_REPORT = "../data/input_dedup_report.json"
 
 BATCH_SIZE = 50
 TARGET_SIZE = 9000
 NON_EVENT_LABEL = "BRAK_ZDARZENIA"
 MODEL_NAME = "gemma-2-27b-it"
 
+# --- DEDUPLIKACJA WEJŚCIA ---
+DEDUPLICATE = True              # prawie identyczne zdania (np. ta sama depesza) wysyłane do LLM tylko raz
+DEDUP_SIMILARITY = DEDUP_THRESHOLD
+
+# --- TRYB ASYNCHRONICZNY ---
+USE_ASYNC = True
+MAX_CONCURRENT_REQUESTS = 8     # maksymalna liczba zapytań w locie
+RATE_LIMIT_PER_SECOND = 2.0     # średnie tempo zapytań (token bucket)
+RATE_LIMIT_BURST = 4            # pojemność kubełka
+MAX_RETRIES = 5                 # liczba ponowień jednej paczki
+BACKOFF_BASE = 1.0              # sekundy, podwajane przy każdej próbie
+BACKOFF_MAX = 60.0
+REQUEST_TIMEOUT = 120
+
 class ClassificationResult(typing.TypedDict):
     text: str
     label: str
@@ -42,15 +70,119 @@ def load_json(filepath):
             print("Plik nie jest JSONem")
             return None
         
+# --- WCZYTYWANIE WEJŚCIA Z DEDUPLIKACJĄ ---
+def load_raw_input():
+    # Dziennik adresuje paczki przesunięciem w tej liście - zgodność sprawdza journal_fingerprint()
+    raw_data = load_json(FILE_RAW_INPUT)
+    if not raw_data or not DEDUPLICATE:
+        return raw_data
+    raw_data, report = deduplicate(raw_data, text_key="Zdanie", threshold=DEDUP_SIMILARITY)
+    print_report(report)
+    save_report(report, FILE_DEDUP_REPORT)
+    return raw_data
+
 # --- ZAPISYWANIE JSON ---
 def save_json(data, filepath):
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=4)
     print(f"Zapisano dane")
 
+# --- DZIENNIK KLASYFIKACJI (APPEND-ONLY) ---
+# Pierwsza linia = nagłówek {"fingerprint": ..., ...}, kolejne = paczki: {"start": ..., "size": ..., "ok": ..., "items": [...]}
+def journal_fingerprint():
+    # Przesunięcia paczek zależą od pliku wejściowego, deduplikacji i rozmiaru paczki
+    sha = hashlib.sha256()
+    with open(FILE_RAW_INPUT, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    header = {
+        "input_sha256": sha.hexdigest(),
+        "dedup": dedup_settings(DEDUP_SIMILARITY) if DEDUPLICATE else None,
+        "batch_size": BATCH_SIZE
+    }
+    header["fingerprint"] = hashlib.sha256(json.dumps(header, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return header
+
+def read_journal_header(filepath):
+    with open(filepath, 'rb') as f:
+        try:
+            record = json.loads(f.readline().decode('utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+    return record if isinstance(record, dict) and "fingerprint" in record else None
+
+def open_journal(filepath, header):
+    # Dziennik z innym odciskiem (albo bez nagłówka) opisuje inne zdania pod tymi samymi przesunięciami -
+    # odkładamy go na bok i zaczynamy nowy (etykiety już zapłaconych zdań zostają w cache)
+    if os.path.exists(filepath):
+        old = read_journal_header(filepath)
+        if old is not None and old["fingerprint"] == header["fingerprint"]:
+            return load_journal(filepath)
+        stale_path = f"{filepath}.{old['fingerprint'] if old else 'bez-naglowka'}"
+        os.replace(filepath, stale_path)
+        print(f"Dziennik nie pasuje do wejścia/ustawień - przeniesiono do {stale_path}, start od nowa")
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return {}
+
+def load_journal(filepath):
+    batches = {}
+    if not os.path.exists(filepath):
+        return batches
+
+    valid_bytes = 0
+    with open(filepath, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line.decode('utf-8'))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # Niedokończony zapis po przerwaniu - odrzucamy resztę pliku
+                break
+            valid_bytes += len(line)
+            if "fingerprint" in record:
+                continue
+            batches[record["start"]] = record
+
+    if valid_bytes != os.path.getsize(filepath):
+        with open(filepath, 'r+b') as f:
+            f.truncate(valid_bytes)
+    return batches
+
+def append_journal(journal_file, start, items, ok):
+    record = {"start": start, "size": len(items), "ok": ok, "items": items}
+    journal_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    journal_file.flush()
+    os.fsync(journal_file.fileno())
+
+def pending_batches(total_items, journal):
+    # Pomijamy paczki, które są już w dzienniku z poprawnym wynikiem
+    starts = []
+    for start in range(0, total_items, BATCH_SIZE):
+        record = journal.get(start)
+        size = min(BATCH_SIZE, total_items - start)
+        if record and record["ok"] and record["size"] == size:
+            continue
+        starts.append(start)
+    return starts
+
+def compact_journal():
+    journal = load_journal(FILE_JOURNAL)
+    classified_data = []
+    for start in sorted(journal):
+        classified_data.extend(journal[start]["items"])
+
+    tmp_path = FILE_CLASSIFIED + ".tmp"
+    save_json(classified_data, tmp_path)
+    os.replace(tmp_path, FILE_CLASSIFIED)
+    return classified_data
+
 # --- PRZYGOTOWANIE PROMPTA ---
-def classify_batch(model, sentences_list):
-    prompt = f"""
+def build_prompt(sentences_list):
+    return f"""
     Jesteś analitykiem zdarzeń (Event Extraction). Twoim celem jest wykrycie CZY w zdaniu opisano konkretne wydarzenie fizyczne, czy jest to tylko opis, opinia lub stan rzeczy.
     Twoim zadaniem jest przypisanie JEDNEJ etykiety do każdego nagłówka.
 
@@ -89,6 +221,45 @@ def classify_batch(model, sentences_list):
     {json.dumps(sentences_list, ensure_ascii=False)}
     """
 
+# Zmiana treści promptu zmienia wersję, a więc i klucze w cache etykiet
+PROMPT_VERSION = hashlib.sha256(build_prompt([]).encode('utf-8')).hexdigest()[:12]
+
+# --- CZYSZCZENIE I ODCZYT ODPOWIEDZI ---
+class ResponseFormatError(ValueError):
+    # Poprawny JSON o złej strukturze (lista zamiast obiektu, brak pól, null) - paczka do ponowienia
+    pass
+
+def parse_response(text):
+    clean_text = text.strip()
+
+    if clean_text.startswith("```json"):
+        clean_text = clean_text[7:]
+    elif clean_text.startswith("```"):
+        clean_text = clean_text[3:]
+    if clean_text.endswith("```"):
+        clean_text = clean_text[:-3]
+    
+    clean_text = clean_text.strip()
+
+    parsed = json.loads(clean_text)
+    return parsed.get("results", [])
+
+def read_results(text, expected):
+    # Każdy błąd odczytu odpowiedzi jako ResponseFormatError - pętla ponowień łapie jeden typ
+    try:
+        results = parse_response(text)
+        if not isinstance(results, list) or not all(isinstance(r, dict) and isinstance(r.get("label"), str) for r in results):
+            raise ValueError("oczekiwano listy obiektów z polem 'label'")
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+        raise ResponseFormatError(f"nieprawidłowa odpowiedź: {e}") from e
+    # Niepełna odpowiedź traktowana jak błąd - ponawiamy całą paczkę
+    if len(results) != expected:
+        raise ResponseFormatError(f"oczekiwano {expected} wyników, otrzymano {len(results)}")
+    return results
+
+def classify_batch(model, sentences_list):
+    prompt = build_prompt(sentences_list)
+
     # --- WYSŁANIE ZAPYTANIA DO AI ---
     try:
         result = model.generate_content(
@@ -98,65 +269,211 @@ def classify_batch(model, sentences_list):
                 max_output_tokens=8192
             )
         )
-        
-        # --- CZYSZCZENIE I ODCZYT ODPOWIEDZI ---
-        clean_text = result.text.strip()
-
-        if clean_text.startswith("```json"):
-            clean_text = clean_text[7:]
-        elif clean_text.startswith("```"):
-            clean_text = clean_text[3:]
-        if clean_text.endswith("```"):
-            clean_text = clean_text[:-3]
-        
-        clean_text = clean_text.strip()
-
-        parsed = json.loads(clean_text)
-        return parsed.get("results", [])
+        return parse_response(result.text)
     
     except Exception as e:
         print(f"Błąd API: {e}")
         return [] 
 
+# --- PRZYPISANIE ETYKIET ---
+def label_objects(batch_objects, labels):
+    labeled = []
+    for original_obj, etykieta in zip(batch_objects, labels):
+        new_obj = original_obj.copy()
+        new_obj["Etykieta"] = etykieta if etykieta is not None else "ERROR_API"
+        labeled.append(new_obj)
+    return labeled
+
+# --- CACHE + DEDUPLIKACJA + DZIENNIK ---
+class LabelingRun:
+    # Zdania znane z cache dostają etykietę od razu, do API trafiają tylko unikalne braki.
+    # Paczka wejściowa jest dopisywana do dziennika, gdy wszystkie jej zdania mają etykietę.
+    def __init__(self, raw_data, starts, cache, journal_file):
+        self.raw_data = raw_data
+        self.cache = cache
+        self.journal_file = journal_file
+        self.batch_keys = {}
+        self.failed = set()
+
+        texts = {}
+        for start in starts:
+            batch_objects = raw_data[start : start + BATCH_SIZE]
+            keys = [cache_key(obj.get("Zdanie", ""), PROMPT_VERSION, MODEL_NAME) for obj in batch_objects]
+            self.batch_keys[start] = keys
+            for key, obj in zip(keys, batch_objects):
+                texts.setdefault(key, obj.get("Zdanie", ""))
+
+        self.labels = cache.get_many(texts)
+        self.misses = [(key, text) for key, text in texts.items() if key not in self.labels]
+        print(f"Zdania: {sum(len(k) for k in self.batch_keys.values())}, unikalne: {len(texts)}, "
+              f"z cache: {len(self.labels)}, do wysłania: {len(self.misses)}")
+
+        self.remaining = {}
+        self.waiting = defaultdict(list)
+        for start, keys in self.batch_keys.items():
+            self.remaining[start] = {key for key in keys if key not in self.labels}
+            for key in self.remaining[start]:
+                self.waiting[key].append(start)
+        for start in [start for start, missing in self.remaining.items() if not missing]:
+            self._write(start)
+
+    def miss_batches(self):
+        for i in range(0, len(self.misses), BATCH_SIZE):
+            yield self.misses[i : i + BATCH_SIZE]
+
+    def resolve(self, miss_batch, api_results):
+        if api_results is not None and len(api_results) == len(miss_batch):
+            entries = [(key, text, res.get("label", "INNE")) for (key, text), res in zip(miss_batch, api_results)]
+            self.cache.put_many(entries, PROMPT_VERSION, MODEL_NAME)
+            for key, _, label in entries:
+                self.labels[key] = label
+        else:
+            self.failed.update(key for key, _ in miss_batch)
+
+        for key, _ in miss_batch:
+            for start in self.waiting.pop(key, []):
+                self.remaining[start].discard(key)
+                if not self.remaining[start]:
+                    self._write(start)
+
+    def _write(self, start):
+        del self.remaining[start]
+        keys = self.batch_keys.pop(start)
+        labels = [self.labels.get(key) for key in keys]
+        ok = all(label is not None for label in labels)
+        append_journal(self.journal_file, start, label_objects(self.raw_data[start : start + BATCH_SIZE], labels), ok)
+
 def run_classification():
     print(f"\nRozpoczęcie klasyfikacji danych...")
     
     if len(API_KEY) == 0:
         print("Brak klucza API")
         return
+    if genai is None:
+        print("Tryb synchroniczny wymaga pakietu google-generativeai (albo USE_ASYNC = True)")
+        return
 
     genai.configure(api_key=API_KEY)
     model = genai.GenerativeModel(MODEL_NAME)
 
-    raw_data = load_json(FILE_RAW_INPUT)
+    raw_data = load_raw_input()
     if not raw_data: return
 
     total_items = len(raw_data)
-    classified_data = []
+    journal = open_journal(FILE_JOURNAL, journal_fingerprint())
+    starts = pending_batches(total_items, journal)
+    print(f"Paczki w dzienniku: {len(journal)}, do przetworzenia: {len(starts)}")
 
     # --- PRZETWARZANIE KAWAŁKAMI ---
-    for i in range(0, total_items, BATCH_SIZE):
-        batch_objects = raw_data[i : i + BATCH_SIZE]
-        batch_texts = [obj.get("Zdanie", "") for obj in batch_objects]
-        
-        print(f"Przetwarzanie od {i}...")
-        
-        api_results = classify_batch(model, batch_texts)
-        
-        for idx, original_obj in enumerate(batch_objects):
-            new_obj = original_obj.copy()
-            etykieta = "ERROR_API"
-            
-            if idx < len(api_results):
-                res = api_results[idx]
-                etykieta = res.get("label", "INNE")
+    cache = LabelCache(FILE_LABEL_CACHE)
+    with open(FILE_JOURNAL, 'a', encoding='utf-8') as journal_file:
+        run = LabelingRun(raw_data, starts, cache, journal_file)
+        for miss_batch in run.miss_batches():
+            print(f"Wysyłanie {len(miss_batch)} zdań...")
             
-            new_obj["Etykieta"] = etykieta
-            classified_data.append(new_obj)
+            api_results = classify_batch(model, [text for _, text in miss_batch])
+            run.resolve(miss_batch, api_results)
+            time.sleep(1)
+    cache.close()
+
+    compact_journal()
+    print(f"\nZakończono klasyfikację")
+
+# --- TRYB ASYNCHRONICZNY: LIMIT ZAPYTAŃ ---
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
 
-        save_json(classified_data, FILE_CLASSIFIED)
-        time.sleep(1)
+# --- TRYB ASYNCHRONICZNY: ZAPYTANIE HTTP ---
+def post_generate_content(prompt):
+    url = f"{API_BASE_URL}/v1beta/models/{MODEL_NAME}:generateContent?key={API_KEY}"
+    body = {
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": {"temperature": 0.0, "maxOutputTokens": 8192}
+    }
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(body, ensure_ascii=False).encode('utf-8'),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+        data = response.read()
+    try:
+        text = json.loads(data.decode('utf-8'))["candidates"][0]["content"]["parts"][0]["text"]
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise ResponseFormatError(f"nieprawidłowa koperta odpowiedzi: {e}") from e
+    if not isinstance(text, str):
+        raise ResponseFormatError("brak tekstu w odpowiedzi")
+    return text
+
+async def classify_batch_async(sentences_list, semaphore, bucket):
+    prompt = build_prompt(sentences_list)
+
+    for attempt in range(MAX_RETRIES + 1):
+        await bucket.acquire()
+        try:
+            async with semaphore:
+                text = await asyncio.to_thread(post_generate_content, prompt)
+            return read_results(text, len(sentences_list))
+        except (urllib.error.URLError, OSError, ResponseFormatError) as e:
+            if attempt == MAX_RETRIES:
+                print(f"Błąd API (po {MAX_RETRIES} ponowieniach): {e}")
+                return None
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+            print(f"Błąd API: {e} - ponowienie za {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+async def run_classification_async():
+    print(f"\nRozpoczęcie klasyfikacji danych (tryb asynchroniczny)...")
+    
+    if len(API_KEY) == 0:
+        print("Brak klucza API")
+        return
+
+    raw_data = load_raw_input()
+    if not raw_data: return
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    bucket = TokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+
+    async def process(miss_batch):
+        api_results = await classify_batch_async([text for _, text in miss_batch], semaphore, bucket)
+        print(f"Odebrano {len(miss_batch)} etykiet...")
+        return miss_batch, api_results
 
+    journal = open_journal(FILE_JOURNAL, journal_fingerprint())
+    starts = pending_batches(len(raw_data), journal)
+    print(f"Paczki w dzienniku: {len(journal)}, do przetworzenia: {len(starts)}")
+
+    cache = LabelCache(FILE_LABEL_CACHE)
+    with open(FILE_JOURNAL, 'a', encoding='utf-8') as journal_file:
+        run = LabelingRun(raw_data, starts, cache, journal_file)
+        tasks = [asyncio.create_task(process(miss_batch)) for miss_batch in run.miss_batches()]
+        for task in asyncio.as_completed(tasks):
+            miss_batch, api_results = await task
+            run.resolve(miss_batch, api_results)
+    cache.close()
+
+    compact_journal()
+
+    if run.failed:
+        print(f"Zdania z błędem API (etykieta ERROR_API, ponowione przy kolejnym uruchomieniu): {len(run.failed)}")
     print(f"\nZakończono klasyfikację")
 
 # --- WYRÓWNYWANIE DANYCH ---
@@ -195,7 +512,10 @@ def run_balancing():
 
 def main():
     print("")
-    run_classification()
+    if USE_ASYNC:
+        asyncio.run(run_classification_async())
+    else:
+        run_classification()
     # run_balancing()
 
 if __name__ == "__main__":
@@ -1,11 +1,15 @@
 import spacy
 import json
+import os
+import hashlib
+import multiprocessing
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.model_selection import train_test_split
 from spacy.tokens import DocBin
 from tqdm import tqdm
-from spacy.cli import download
+from deduplication import deduplicate, print_report, save_report, DEDUP_THRESHOLD
 
 # --- KONFIGURACJA ---
 label_map = {
@@ -16,103 +20,155 @@ label_map = {
     "KATASTROFA": 4,
     "WYPADEK": 5
 }
+cats_list = ["BRAK_ZDARZENIA", "PRZESTEPSTWO", "POLITYKA", "BIZNES", "KATASTROFA", "WYPADEK"]
+
+FILE_DATASET = "../data/train_dataset.json"
+SHARDS_DIR = "../data/shards"               # wynik: shards/{train,dev,test}/part-XXX.spacy
+MANIFEST_FILE = os.path.join(SHARDS_DIR, "manifest.json")
+FILE_DEDUP_REPORT = "../data/train_dedup_report.json"
+
+# --- PARAMETRY PODZIAŁU I KONWERSJI ---
+split_params = {
+    "test_size": 0.1,       # część odłożona na walidację + test
+    "holdout_split": 0.5,   # podział odłożonej części na walidację / test
+    "random_state": 42,
+    "language": "pl",
+    # Prawie identyczne zdania usuwane przed podziałem - ta sama depesza nie trafia do treningu i testu
+    "dedup_threshold": DEDUP_THRESHOLD     # None = bez deduplikacji
+}
+SHARD_SIZE = 2000           # liczba dokumentów w jednym pliku .spacy
+NUM_WORKERS = os.cpu_count() or 1
+
+# --- CACHE KONWERSJI ---
+def conversion_key():
+    sha = hashlib.sha256()
+    with open(FILE_DATASET, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return {"dataset": sha.hexdigest(), "params": split_params, "shard_size": SHARD_SIZE}
+
+def is_cached(key):
+    if not os.path.exists(MANIFEST_FILE):
+        return False
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("key") != key:
+        return False
+    return all(os.path.exists(os.path.join(SHARDS_DIR, path)) for path in manifest.get("files", []))
+
+# --- TOKENIZACJA W PROCESACH ROBOCZYCH ---
+_nlp = None
+
+def tokenize_shard(texts, label_ids, output_file):
+    # Sam tokenizer języka polskiego - bez wczytywania wektorów i komponentów pl_core_news_lg
+    global _nlp
+    if _nlp is None:
+        _nlp = spacy.blank(split_params["language"])
 
-# --- ŁADOWANIE DANYCH ---
-try:
-    with open('../data/train_dataset.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-except FileNotFoundError:
-    print("Nie znaleziono pliku 'train_dataset.json'.")
-    exit()
-
-df = pd.DataFrame(data)
-
-df['label_id'] = df['Etykieta'].map(label_map)
-df = df.dropna(subset=['label_id'])
-df['label_id'] = df['label_id'].astype(int)
-
-X = df['Zdanie'].values
-y = df['label_id'].values
-
-print(f"Wczytano poprawnie: {len(X)} rekordów.")
-
-# --- PODZIAŁ DANYCH (TRENING / WALIDACJA / TEST) ---
-X_train, X_temp, y_train, y_temp = train_test_split(
-    X, y, 
-    test_size=0.1, 
-    stratify=y,     
-    random_state=42
-)
-
-X_val, X_test, y_val, y_test = train_test_split(
-    X_temp, y_temp, 
-    test_size=0.5, 
-    stratify=y_temp, 
-    random_state=42
-)
-
-print(f"\n--- WYNIK PODZIAŁU ---")
-print(f"Zbiór Treningowy (do nauki):    {len(X_train)} rekordów")
-print(f"Zbiór Walidacyjny (do tuningu): {len(X_val)} rekordów")
-print(f"Zbiór Testowy:      {len(X_test)} rekordów")
-
-unique, counts = np.unique(y_test, return_counts=True)
-print("\nRozkład klas w zbiorze testowym (450):")
-
-inv_map = {v: k for k, v in label_map.items()}
-for label_id, count in zip(unique, counts):
-    print(f"  {inv_map[label_id]}: {count}")
-
-
-# --- PRZYGOTOWANIE SPACY ---
-print("\n--- KONWERSJA DANYCH DO FORMATU SPACY ---")
-try:
-    nlp = spacy.load("pl_core_news_lg")
-except OSError:
-    print("Brak modelu 'pl_core_news_lg'. Pobieram...")
-    download("pl_core_news_lg")
-    nlp = spacy.load("pl_core_news_lg")
-
-# --- FUNKCJA KONWERTUJĄCA ---
-def save_spacy_data(texts, labels, output_file, oversample=False):
     db = DocBin()
-    
-    df_temp = pd.DataFrame({'text': texts, 'label_id': labels})
-    cats_list = ["BRAK_ZDARZENIA", "PRZESTEPSTWO", "POLITYKA", "BIZNES", "KATASTROFA", "WYPADEK"]
-    
-    # --- OVERSAMPLING ---
-    if oversample:
-        print(f"Oversampling włączony dla {output_file}...")
-        max_size = df_temp['label_id'].value_counts().max()
-        
-        new_df_parts = []
-        for class_id, group in df_temp.groupby('label_id'):
-            if len(group) < max_size:
-                resampled = group.sample(max_size, replace=True, random_state=42)
-                new_df_parts.append(resampled)
-            else:
-                new_df_parts.append(group)
-        
-        df_temp = pd.concat(new_df_parts).sample(frac=1, random_state=42).reset_index(drop=True)
-        print(f"Liczebność po oversamplingu: {len(df_temp)} (było: {len(texts)})")
-
-    # --- TWORZENIE DOKUMENTÓW SPACY ---
-    for text, label_id in tqdm(zip(df_temp['text'], df_temp['label_id']), total=len(df_temp), desc=f"Generowanie {output_file}"):
-        doc = nlp.make_doc(str(text))
-        
+    for doc, label_id in zip(_nlp.tokenizer.pipe((str(t) for t in texts), batch_size=1000), label_ids):
         cats = {category: 0.0 for category in cats_list}
-        true_label_name = cats_list[int(label_id)]
-        cats[true_label_name] = 1.0
-        
+        cats[cats_list[int(label_id)]] = 1.0
         doc.cats = cats
         db.add(doc)
-    
     db.to_disk(output_file)
-    print(f"Zapisano: {output_file}")
+    return output_file
 
-# --- GENEROWANIE PLIKÓW ---
-save_spacy_data(X_train, y_train, "../data/data_train.spacy", oversample=True)
-save_spacy_data(X_val, y_val, "../data/data_dev.spacy", oversample=False)
-save_spacy_data(X_test, y_test, "../data/data_test.spacy", oversample=False)
+# --- FUNKCJA KONWERTUJĄCA ---
+def save_spacy_data(pool, texts, labels, split_name):
+    # Bez oversamplingu - balansowanie klas robi czytnik event.BalancedCorpus.v1 w trakcie treningu
+    df_temp = pd.DataFrame({'text': texts, 'label_id': labels})
 
-print("\nPliki .spacy gotowe.")
\ No newline at end of file
+    # --- TWORZENIE DOKUMENTÓW SPACY (RÓWNOLEGLE, W SHARDACH) ---
+    split_dir = os.path.join(SHARDS_DIR, split_name)
+    os.makedirs(split_dir, exist_ok=True)
+    for name in os.listdir(split_dir):
+        if name.endswith(".spacy"):
+            os.remove(os.path.join(split_dir, name))
+
+    futures = []
+    for shard_idx, start in enumerate(range(0, len(df_temp), SHARD_SIZE)):
+        part = df_temp.iloc[start : start + SHARD_SIZE]
+        output_file = os.path.join(split_dir, f"part-{shard_idx:03d}.spacy")
+        futures.append(pool.submit(tokenize_shard, part['text'].tolist(), part['label_id'].tolist(), output_file))
+
+    files = [os.path.relpath(f.result(), SHARDS_DIR) for f in tqdm(futures, desc=f"Generowanie {split_name}")]
+    print(f"Zapisano: {split_dir} ({len(files)} plików)")
+    return files
+
+def main():
+    key = conversion_key()
+    if is_cached(key):
+        print(f"Dane w {SHARDS_DIR} są aktualne - pomijam konwersję.")
+        return
+
+    # --- ŁADOWANIE DANYCH ---
+    try:
+        with open(FILE_DATASET, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print("Nie znaleziono pliku 'train_dataset.json'.")
+        return
+
+    if split_params["dedup_threshold"] is not None:
+        data, report = deduplicate(data, text_key="Zdanie", label_key="Etykieta",
+                                   threshold=split_params["dedup_threshold"])
+        print_report(report)
+        save_report(report, FILE_DEDUP_REPORT)
+
+    df = pd.DataFrame(data)
+
+    df['label_id'] = df['Etykieta'].map(label_map)
+    df = df.dropna(subset=['label_id'])
+    df['label_id'] = df['label_id'].astype(int)
+
+    X = df['Zdanie'].values
+    y = df['label_id'].values
+
+    print(f"Wczytano poprawnie: {len(X)} rekordów.")
+
+    # --- PODZIAŁ DANYCH (TRENING / WALIDACJA / TEST) ---
+    X_train, X_temp, y_train, y_temp = train_test_split(
+        X, y,
+        test_size=split_params["test_size"],
+        stratify=y,
+        random_state=split_params["random_state"]
+    )
+
+    X_val, X_test, y_val, y_test = train_test_split(
+        X_temp, y_temp,
+        test_size=split_params["holdout_split"],
+        stratify=y_temp,
+        random_state=split_params["random_state"]
+    )
+
+    print(f"\n--- WYNIK PODZIAŁU ---")
+    print(f"Zbiór Treningowy (do nauki):    {len(X_train)} rekordów")
+    print(f"Zbiór Walidacyjny (do tuningu): {len(X_val)} rekordów")
+    print(f"Zbiór Testowy:      {len(X_test)} rekordów")
+
+    unique, counts = np.unique(y_test, return_counts=True)
+    print(f"\nRozkład klas w zbiorze testowym ({len(y_test)}):")
+
+    inv_map = {v: k for k, v in label_map.items()}
+    for label_id, count in zip(unique, counts):
+        print(f"  {inv_map[label_id]}: {count}")
+
+    # --- GENEROWANIE PLIKÓW ---
+    print("\n--- KONWERSJA DANYCH DO FORMATU SPACY ---")
+    # Przerwana konwersja nie może zostać uznana za aktualną
+    if os.path.exists(MANIFEST_FILE):
+        os.remove(MANIFEST_FILE)
+    files = []
+    with ProcessPoolExecutor(max_workers=NUM_WORKERS, mp_context=multiprocessing.get_context("spawn")) as pool:
+        files += save_spacy_data(pool, X_train, y_train, "train")
+        files += save_spacy_data(pool, X_val, y_val, "dev")
+        files += save_spacy_data(pool, X_test, y_test, "test")
+
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"key": key, "files": files}, f, indent=4)
+
+    print("\nPliki .spacy gotowe.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import json
+import re
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from label_cache import normalize_sentence
+
+# --- DEDUPLIKACJA PRAWIE IDENTYCZNYCH ZDAŃ (MINHASH + LSH) ---
+# Każde zdanie -> zbiór 5-znakowych fragmentów -> sygnatura MinHash (NUM_PERM minimów).
+# Sygnatury dzielone są na pasma; zdania z identycznym pasmem trafiają do wspólnego kubełka
+# i tylko one są porównywane (podobieństwo Jaccarda szacowane z sygnatur). Czas ~liniowy.
+# Z każdego klastra zostaje pierwsze wystąpienie - wynik jest deterministyczny.
+
+# --- KONFIGURACJA ---
+DEDUP_THRESHOLD = 0.8       # minimalne podobieństwo Jaccarda, od którego zdania są duplikatami
+NUM_PERM = 128              # liczba funkcji haszujących w sygnaturze
+SHINGLE_SIZE = 5            # długość fragmentu znakowego
+LSH_RECALL = 0.95           # wymagane prawdopodobieństwo, że para o podobieństwie = progowi trafi do kubełka
+SEED = 42
+REPORT_EXAMPLES = 20        # liczba największych klastrów w raporcie
+MAX_HASH = np.uint64(0xFFFFFFFF)
+
+def dedup_settings(threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM):
+    # Wszystko, od czego zależy wynik deduplikacji (a więc kolejność i przesunięcia zdań po niej)
+    return {"threshold": threshold, "num_perm": num_perm, "shingle_size": SHINGLE_SIZE,
+            "lsh_recall": LSH_RECALL, "seed": SEED}
+
+def shingles(text):
+    text = re.sub(r"[^\w\s]", " ", normalize_sentence(text).lower())
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def lsh_params(threshold, num_perm=NUM_PERM):
+    # Najdłuższe pasmo (najmniej fałszywych kandydatów), przy którym para na progu
+    # zostaje kandydatem z prawdopodobieństwem >= LSH_RECALL: 1 - (1 - t^r)^b
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= LSH_RECALL:
+            return bands, rows
+    return num_perm, 1
+
+class MinHasher:
+    # Haszowanie multiply-shift: (a * x + b) mod 2^64, górne 32 bity; a nieparzyste
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        values = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles(text)), dtype=np.uint64)
+        hashes = (values[:, None] * self.a + self.b) >> np.uint64(32)
+        return (hashes & MAX_HASH).min(axis=0).astype(np.uint32)
+
+# --- UNION-FIND ---
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def _union(parent, i, j):
+    # Korzeniem zostaje mniejszy indeks - reprezentant to pierwsze wystąpienie
+    i, j = _find(parent, i), _find(parent, j)
+    if i != j:
+        parent[max(i, j)] = min(i, j)
+
+# --- KLASTROWANIE ---
+def find_clusters(texts, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM):
+    # Zwraca listę klastrów (list indeksów, rosnąco); pierwszy indeks klastra to reprezentant
+    parent = list(range(len(texts)))
+
+    # Identyczne po normalizacji - bez liczenia sygnatur
+    unique = {}
+    for i, text in enumerate(texts):
+        key = " ".join(sorted(shingles(text)))
+        if key in unique:
+            _union(parent, unique[key], i)
+        else:
+            unique[key] = i
+    candidates = list(unique.values())
+
+    bands, rows = lsh_params(threshold, num_perm)
+    hasher = MinHasher(num_perm)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for i in candidates:
+        signatures[i] = hasher.signature(texts[i])
+
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i in candidates:
+            buckets[signatures[i, band * rows : (band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            # Każde zdanie porównywane tylko z "liderami" kubełka, nie ze wszystkimi parami
+            leaders = []
+            for i in members:
+                for leader in leaders:
+                    if _find(parent, i) == _find(parent, leader):
+                        break
+                    if np.count_nonzero(signatures[i] == signatures[leader]) >= threshold * num_perm:
+                        _union(parent, i, leader)
+                        break
+                else:
+                    leaders.append(i)
+
+    clusters = defaultdict(list)
+    for i in range(len(texts)):
+        clusters[_find(parent, i)].append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+def deduplicate(items, text_key="Zdanie", label_key=None, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM):
+    # items: lista słowników; zwraca (reprezentanci w oryginalnej kolejności, raport)
+    started = time.perf_counter()
+    texts = [str(item.get(text_key, "")) for item in items]
+    clusters = find_clusters(texts, threshold, num_perm)
+    kept = [items[members[0]] for members in clusters]
+    bands, rows = lsh_params(threshold, num_perm)
+
+    duplicates = sorted((members for members in clusters if len(members) > 1), key=len, reverse=True)
+    report = {
+        "input": len(items),
+        "kept": len(kept),
+        "removed": len(items) - len(kept),
+        "clusters": len(duplicates),
+        "largest_cluster": len(duplicates[0]) if duplicates else 1,
+        "threshold": threshold,
+        "num_perm": num_perm,
+        "bands": bands,
+        "rows": rows,
+        "seconds": round(time.perf_counter() - started, 3),
+        "examples": [[texts[i] for i in members[:5]] for members in duplicates[:REPORT_EXAMPLES]]
+    }
+    if label_key is not None:
+        # Klastry, w których duplikaty mają różne etykiety - szum w danych treningowych
+        conflicts = [members for members in duplicates if len({items[i].get(label_key) for i in members}) > 1]
+        report["label_conflicts"] = len(conflicts)
+        report["conflict_examples"] = [
+            [(texts[i], items[i].get(label_key)) for i in members[:5]] for members in conflicts[:REPORT_EXAMPLES]
+        ]
+    return kept, report
+
+def print_report(report):
+    print(f"Deduplikacja (próg {report['threshold']}, {report['bands']} pasm x {report['rows']}): "
+          f"{report['input']} -> {report['kept']} zdań, usunięto {report['removed']} "
+          f"w {report['clusters']} klastrach (największy: {report['largest_cluster']}), {report['seconds']} s")
+    if "label_conflicts" in report:
+        print(f"Klastry z różnymi etykietami: {report['label_conflicts']}")
+
+def save_report(report, filepath):
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
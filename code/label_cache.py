@@ -0,0 +1,62 @@
+import hashlib
+import re
+import sqlite3
+import time
+import unicodedata
+
+# --- CACHE ETYKIET LLM (SQLITE) ---
+# Klucz = skrót znormalizowanego zdania + wersji promptu + nazwy modelu,
+# więc zmiana promptu lub modelu automatycznie unieważnia stare wpisy.
+
+SQLITE_MAX_VARIABLES = 900
+
+def normalize_sentence(text):
+    text = unicodedata.normalize("NFC", str(text or ""))
+    return re.sub(r"\s+", " ", text).strip()
+
+def cache_key(text, prompt_version, model_name):
+    raw = "\x1f".join([normalize_sentence(text), prompt_version, model_name])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class LabelCache:
+    def __init__(self, filepath):
+        self.conn = sqlite3.connect(filepath)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS labels (
+                key TEXT PRIMARY KEY,
+                label TEXT NOT NULL,
+                sentence TEXT,
+                prompt_version TEXT,
+                model_name TEXT,
+                created REAL
+            )
+        """)
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = {}
+        for i in range(0, len(keys), SQLITE_MAX_VARIABLES):
+            chunk = keys[i : i + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT key, label FROM labels WHERE key IN ({placeholders})", chunk)
+            found.update(rows)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries, prompt_version, model_name):
+        # entries: lista (klucz, zdanie, etykieta)
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO labels (key, label, sentence, prompt_version, model_name, created) VALUES (?, ?, ?, ?, ?, ?)",
+            [(key, label, sentence, prompt_version, model_name, now) for key, sentence, label in entries]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -1,71 +1,168 @@
 import spacy
 import pandas as pd
-from spacy.tokens import DocBin
+import numpy as np
+from spacy.tokens import Doc
 from spacy.training import Example
-import tabulate
+from spacy.scorer import Scorer
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import time
+import sys
 import os
 
+from balanced_corpus import load_docs, resolve_docbin_path
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
 # --- KONFIGURACJA MODELI ---
 models_dirs = {
-    "1. Baseline": "../models/output_ensemble/model-best",     
-    "2. BOW (Simple)": "../models/output_bow/model-best",       
+    "1. Baseline": "../models/output_ensemble/model-best",
+    "2. BOW (Simple)": "../models/output_bow/model-best",
     "3. Dropout (Tuned)": "../models/output_dropout/model-best",
-    "4. Bigram (Context)": "../models/output_bigram/model-best", 
+    "4. Bigram (Context)": "../models/output_bigram/model-best",
     "5. Light (Fast)": "../models/output_light/model-best",
     "6. Herbert": "../models/output_herbert/model-best",
 }
 
-# --- WCZYTYWANIE DANYCH TESTOWYCH ---
-print("Wczytywanie pliku test.spacy...")
-if not os.path.exists("../data/data_test.spacy"):
-    print("Brak pliku test.spacy")
-    exit()
+FILE_TEST = "../data/shards/test"     # katalog z plikami .spacy (albo pojedynczy plik)
+FILE_TEST_FALLBACK = "../data/data_test.spacy"  # pojedynczy plik ze starszej wersji data_preparation.py
 
-doc_bin = DocBin().from_disk("../data/data_test.spacy")
-results = []
+# --- PARAMETRY EWALUACJI ---
+EVAL_BATCH_SIZE = 256       # rozmiar paczki dla nlp.pipe
+PARALLEL_WORKERS = 3        # liczba modeli ocenianych naraz
+THREADS_PER_WORKER = 2      # limit wątków BLAS/torch na proces (żeby procesy się nie zagłuszały)
 
-print("\n--- PORÓWNANIE MODELI ---")
+# --- OGRANICZENIE WĄTKÓW ---
+def limit_child_threads(threads):
+    # Procesy "spawn" dziedziczą środowisko rodzica i importują numpy/spacy dopiero przy
+    # rozpakowaniu zadania - zmienne muszą być ustawione przed utworzeniem puli
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
 
-# --- TESTOWANIE MODELI ---
-for name, model_path in models_dirs.items():
+def limit_torch_threads(threads):
     try:
-        if not os.path.exists(model_path):
-            print(f"Pominięto (brak folderu): {model_path}")
-            continue
-            
-        nlp = spacy.load(model_path)
-        docs_test = list(doc_bin.get_docs(nlp.vocab))
-        
-        examples = []
-        for doc in docs_test:
-            pred_doc = nlp(doc.text)
-            examples.append(Example(pred_doc, doc))
-            
-        scores = nlp.evaluate(examples)
-        
-        results.append({
-            "Model": name,
-            "Precision": scores.get("cats_macro_p", 0.0), 
-            "Recall": scores.get("cats_macro_r", 0.0),   
-            "F1 Score": scores.get("cats_macro_f", 0.0), 
-            "Accuracy": scores.get("cats_score", 0.0)   
-        })
-        
-    except Exception as e:
-        print(f"Błąd przy modelu {name}: {e}")
-
-# --- PREZENTACJA WYNIKÓW ---
-df = pd.DataFrame(results)
-
-if not df.empty:
-    df = df.sort_values(by="F1 Score", ascending=False)
-    
-    df_display = df.copy()
-    cols = ["Precision", "Recall", "F1 Score", "Accuracy"]
-    for col in cols:
-        df_display[col] = df_display[col].apply(lambda x: f"{x:.2%}")
-    
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+def peak_rss_mb():
+    if resource is not None:
+        # ru_maxrss jest w KB na Linuksie i w bajtach na macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
     try:
-        print(df_display.to_markdown(index=False))
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
     except ImportError:
-        print(df_display.to_string(index=False))
\ No newline at end of file
+        return float("nan")
+
+
+# --- OCENA JEDNEGO MODELU (W OSOBNYM PROCESIE) ---
+def evaluate_model(name, model_path, test_path):
+    limit_torch_threads(THREADS_PER_WORKER)
+
+    start = time.perf_counter()
+    nlp = spacy.load(model_path)
+    load_time = time.perf_counter() - start
+
+    gold_docs = load_docs(test_path, nlp.vocab)
+
+    # Dokumenty wejściowe z gotowych tokenów - bez ponownej tokenizacji tekstu
+    def fresh_docs():
+        return [Doc(nlp.vocab, words=[t.text for t in doc], spaces=[bool(t.whitespace_) for t in doc]) for doc in gold_docs]
+
+    # Przepustowość: całość przez nlp.pipe
+    inputs = fresh_docs()
+    start = time.perf_counter()
+    pred_docs = list(nlp.pipe(inputs, batch_size=EVAL_BATCH_SIZE))
+    pipe_time = time.perf_counter() - start
+
+    # Opóźnienie: każde zdanie osobno
+    latencies = []
+    for doc in fresh_docs():
+        start = time.perf_counter()
+        nlp(doc)
+        latencies.append(time.perf_counter() - start)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+
+    # Jakość: ocena gotowych predykcji (nlp.evaluate uruchomiłby potok ponownie)
+    examples = [Example(pred, gold) for pred, gold in zip(pred_docs, gold_docs)]
+    scores = Scorer(nlp).score(examples)
+
+    return {
+        "Model": name,
+        "Precision": scores.get("cats_macro_p", 0.0),
+        "Recall": scores.get("cats_macro_r", 0.0),
+        "F1 Score": scores.get("cats_macro_f", 0.0),
+        "Accuracy": scores.get("cats_score", 0.0),
+        "Load [s]": load_time,
+        "Docs/s": len(pred_docs) / pipe_time if pipe_time > 0 else 0.0,
+        "p50 [ms]": p50,
+        "p95 [ms]": p95,
+        "p99 [ms]": p99,
+        "Peak RSS [MB]": peak_rss_mb()
+    }
+
+def main():
+    # --- WCZYTYWANIE DANYCH TESTOWYCH ---
+    test_path = resolve_docbin_path(FILE_TEST, FILE_TEST_FALLBACK)
+    if test_path is None:
+        print(f"Brak danych testowych ({FILE_TEST} ani {FILE_TEST_FALLBACK}) - uruchom najpierw data_preparation.py")
+        return
+    print(f"Wczytywanie danych testowych z {test_path}...")
+
+    results = []
+
+    print("\n--- PORÓWNANIE MODELI ---")
+
+    # --- TESTOWANIE MODELI (RÓWNOLEGLE) ---
+    # Każdy model w świeżym procesie, żeby szczytowe RSS dotyczyło tylko jego
+    limit_child_threads(THREADS_PER_WORKER)
+    with ProcessPoolExecutor(
+        max_workers=PARALLEL_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1
+    ) as pool:
+        futures = {}
+        for name, model_path in models_dirs.items():
+            if not os.path.exists(model_path):
+                print(f"Pominięto (brak folderu): {model_path}")
+                continue
+            futures[pool.submit(evaluate_model, name, model_path, test_path)] = name
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results.append(future.result())
+                print(f"Oceniono: {name}")
+            except Exception as e:
+                print(f"Błąd przy modelu {name}: {e}")
+
+    # --- PREZENTACJA WYNIKÓW ---
+    df = pd.DataFrame(results)
+
+    if not df.empty:
+        df = df.sort_values(by="F1 Score", ascending=False)
+
+        df_display = df.copy()
+        cols = ["Precision", "Recall", "F1 Score", "Accuracy"]
+        for col in cols:
+            df_display[col] = df_display[col].apply(lambda x: f"{x:.2%}")
+        df_display["Load [s]"] = df_display["Load [s]"].apply(lambda x: f"{x:.2f}")
+        df_display["Docs/s"] = df_display["Docs/s"].apply(lambda x: f"{x:.0f}")
+        for col in ["p50 [ms]", "p95 [ms]", "p99 [ms]"]:
+            df_display[col] = df_display[col].apply(lambda x: f"{x:.2f}")
+        df_display["Peak RSS [MB]"] = df_display["Peak RSS [MB]"].apply(lambda x: f"{x:.0f}")
+
+        try:
+            print(df_display.to_markdown(index=False))
+        except ImportError:
+            print(df_display.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
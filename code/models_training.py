@@ -1,16 +1,20 @@
 import os
-from spacy.cli.train import train
+import sys
+import json
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # --- LISTA EKSPERYMENTÓW ---
 experiments = [
     {
         "name": "Exp_A_Ensemble",
-        "config": "../config/config.cfg",      
+        "config": "../config/config.cfg",
         "output": "../models/output_ensemble"
     },
     {
         "name": "Exp_B_BOW",
-        "config": "../config/config_bow.cfg", 
+        "config": "../config/config_bow.cfg",
         "output": "../models/output_bow"
     },
     {
@@ -20,35 +24,146 @@ experiments = [
     },
     {
         "name": "Exp_D_Bigram",
-        "config": "../config/config_bigram.cfg", 
+        "config": "../config/config_bigram.cfg",
         "output": "../models/output_bigram"
     },
     {
         "name": "Exp_E_Light",
-        "config": "../config/config_light.cfg", 
+        "config": "../config/config_light.cfg",
         "output": "../models/output_light"
     }
 ]
 
-# --- PĘTLA TRENINGOWA ---
-for exp in experiments:
-    print(f"\nTrenowanie: {exp['name']}...")
-    
-    if not os.path.exists(exp['config']):
-        print(f"Brak pliku {exp['config']}!.")
-        continue
+# --- KONFIGURACJA HARMONOGRAMU ---
+TRAIN_PATH = "../data/shards/train"     # katalogi z plikami .spacy z data_preparation.py
+DEV_PATH = "../data/shards/dev"
+TRAIN_FALLBACK = "../data/data_train.spacy"     # pojedyncze pliki ze starszej wersji data_preparation.py
+DEV_FALLBACK = "../data/data_dev.spacy"
+LOGS_DIR = "../models/logs"
+CORPUS_READER = "balanced_corpus.py"     # czytnik danych z configów - jego zmiana zmienia trening
+RUN_STAMP = "run.json"          # odcisk zakończonego treningu w katalogu wyjściowym
+THREADS_PER_JOB = 4             # limit wątków BLAS/torch na jeden trening
+PARALLEL_JOBS = max(1, min(len(experiments), (os.cpu_count() or 1) // THREADS_PER_JOB))
+
+# --- DANE WEJŚCIOWE ---
+def resolve_data_path(path, fallback):
+    # Katalog shardów z data_preparation.py, a gdy go nie ma - pojedynczy plik .spacy
+    if os.path.isfile(path):
+        return path
+    if os.path.isdir(path) and any(name.endswith(".spacy") for name in os.listdir(path)):
+        return path
+    if os.path.isfile(fallback):
+        print(f"Brak {path} - używam {fallback}")
+        return fallback
+    raise SystemExit(f"Brak danych treningowych ({path} ani {fallback}) - uruchom najpierw data_preparation.py")
+
+# --- ODCISK WEJŚĆ ---
+def file_hash(path):
+    # Plik albo katalog (wszystkie pliki .spacy w kolejności nazw)
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".spacy"))
+    else:
+        files = [path]
+    sha = hashlib.sha256()
+    for file_path in files:
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+    return sha.hexdigest()
+
+def run_fingerprint(exp, overrides):
+    return {
+        "config": file_hash(exp['config']),
+        "reader": file_hash(os.path.join(os.path.dirname(os.path.abspath(__file__)), CORPUS_READER)),
+        "train": file_hash(overrides["paths.train"]),
+        "dev": file_hash(overrides["paths.dev"]),
+        "overrides": overrides
+    }
+
+def is_up_to_date(exp, fingerprint):
+    stamp_path = os.path.join(exp['output'], RUN_STAMP)
+    if not os.path.exists(stamp_path) or not os.path.isdir(os.path.join(exp['output'], "model-best")):
+        return False
+    with open(stamp_path, 'r', encoding='utf-8') as f:
+        return json.load(f) == fingerprint
+
+# --- TRENING W OSOBNYM PROCESIE ---
+def limit_threads(threads):
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+def train_experiment(exp, overrides, fingerprint):
+    # Limity wątków muszą być ustawione przed importem spacy/numpy/torch w tym procesie
+    limit_threads(THREADS_PER_JOB)
+
+    # Całe wyjście procesu (także z bibliotek C) trafia do pliku logu eksperymentu
+    log_path = os.path.join(LOGS_DIR, f"{exp['name']}.log")
+    log_file = open(log_path, 'w', encoding='utf-8', buffering=1)
+    os.dup2(log_file.fileno(), sys.stdout.fileno())
+    os.dup2(log_file.fileno(), sys.stderr.fileno())
 
-    # --- URUCHOMIENIE TRENINGU ---
     try:
-        train(
-            exp['config'],
-            exp['output'],
-            overrides={
-                "paths.train": "../data/data_train.spacy",
-                "paths.dev": "../data/data_dev.spacy"
-            },
-            use_gpu=-1
-        )
-        print(f"Zakończono: {exp['name']}")
-    except Exception as e:
-        print(f"Błąd podczas treningu {exp['name']}: {e}")
\ No newline at end of file
+        import torch
+        torch.set_num_threads(THREADS_PER_JOB)
+    except ImportError:
+        pass
+    from spacy.cli.train import train
+    import balanced_corpus  # rejestruje czytnik event.BalancedCorpus.v1 używany w configach
+
+    # --- URUCHOMIENIE TRENINGU ---
+    train(exp['config'], exp['output'], overrides=overrides, use_gpu=-1)
+
+    # --- METRYKI I ODCISK ---
+    meta_path = os.path.join(exp['output'], "model-best", "meta.json")
+    metrics = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            metrics = json.load(f).get("performance", {})
+    with open(os.path.join(LOGS_DIR, f"{exp['name']}.metrics.json"), 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=4)
+    with open(os.path.join(exp['output'], RUN_STAMP), 'w', encoding='utf-8') as f:
+        json.dump(fingerprint, f, indent=4)
+
+    return metrics
+
+# --- HARMONOGRAM ---
+def main():
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    overrides = {
+        "paths.train": resolve_data_path(TRAIN_PATH, TRAIN_FALLBACK),
+        "paths.dev": resolve_data_path(DEV_PATH, DEV_FALLBACK)
+    }
+
+    jobs = []
+    for exp in experiments:
+        if not os.path.exists(exp['config']):
+            print(f"Brak pliku {exp['config']}!.")
+            continue
+        fingerprint = run_fingerprint(exp, overrides)
+        if is_up_to_date(exp, fingerprint):
+            print(f"Pominięto (aktualny): {exp['name']}")
+            continue
+        jobs.append((exp, fingerprint))
+
+    print(f"\nTrenowanie {len(jobs)} eksperymentów, {PARALLEL_JOBS} naraz, logi w {LOGS_DIR}")
+
+    with ProcessPoolExecutor(
+        max_workers=PARALLEL_JOBS,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1
+    ) as pool:
+        futures = {}
+        for exp, fingerprint in jobs:
+            print(f"Trenowanie: {exp['name']}...")
+            futures[pool.submit(train_experiment, exp, overrides, fingerprint)] = exp
+
+        for future in as_completed(futures):
+            exp = futures[future]
+            try:
+                metrics = future.result()
+                print(f"Zakończono: {exp['name']} (cats_score: {metrics.get('cats_score', 0.0):.4f})")
+            except Exception as e:
+                print(f"Błąd podczas treningu {exp['name']}: {e} (log: {LOGS_DIR}/{exp['name']}.log)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- LOKALNA ZAŚLEPKA API MODELU ---
+# Udaje endpoint generateContent, żeby testować tryb asynchroniczny
+# data_classification.py bez dostępu do sieci:
+#   python stub_llm_server.py --port 8080 --error-rate 0.1
+#   LLM_API_BASE_URL=http://127.0.0.1:8080 LLM_API_KEY=test python data_classification.py
+
+PROMPT_MARKER = "Lista zdań do analizy:"
+
+KEYWORDS = {
+    "PRZESTEPSTWO": ["policj", "zatrzyma", "ukradł", "aresztowa", "zabił"],
+    "KATASTROFA": ["pożar", "powódź", "wybuch", "huragan", "spłonął"],
+    "WYPADEK": ["wypadek", "kolizj", "potrącił", "dachował"],
+    "BIZNES": ["firma", "spółka", "akcje", "zysk", "bankrut"],
+    "POLITYKA": ["premier", "minister", "sejm", "ustaw", "wybory"],
+}
+
+def label_sentence(sentence):
+    lowered = sentence.lower()
+    for label, words in KEYWORDS.items():
+        if any(w in lowered for w in words):
+            return label
+    return "BRAK_ZDARZENIA"
+
+class StubHandler(BaseHTTPRequestHandler):
+    error_rate = 0.0
+    latency = 0.0
+    truncate_rate = 0.0
+    malformed_rate = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length).decode('utf-8'))
+
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self.send_error(503, "Simulated error")
+            return
+
+        prompt = body["contents"][0]["parts"][0]["text"]
+        sentences = json.loads(prompt[prompt.index(PROMPT_MARKER) + len(PROMPT_MARKER):])
+        results = [{"text": s, "label": label_sentence(s)} for s in sentences]
+        if random.random() < self.truncate_rate:
+            results = results[:len(results) // 2]
+
+        text = "```json\n" + json.dumps({"results": results}, ensure_ascii=False) + "\n```"
+        payload = {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+        if random.random() < self.malformed_rate:
+            # Poprawny JSON o złej strukturze: lista zamiast obiektu albo null zamiast tekstu
+            payload = random.choice([
+                {"candidates": [{"content": {"parts": [{"text": json.dumps(results, ensure_ascii=False)}]}}]},
+                {"candidates": [{"content": {"parts": [{"text": None}]}}]},
+                {"candidates": []},
+            ])
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Zaślepka API modelu językowego")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="odsetek odpowiedzi 503")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="odsetek niepełnych odpowiedzi")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="odsetek odpowiedzi o złej strukturze")
+    parser.add_argument("--latency", type=float, default=0.5, help="opóźnienie odpowiedzi w sekundach")
+    args = parser.parse_args()
+
+    StubHandler.error_rate = args.error_rate
+    StubHandler.truncate_rate = args.truncate_rate
+    StubHandler.malformed_rate = args.malformed_rate
+    StubHandler.latency = args.latency
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Zaślepka API działa na http://{args.host}:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
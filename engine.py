@@ -0,0 +1,448 @@
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+import spacy
+from spacy.tokens import Doc
+from extraction import EventExtractor
+from profiling import timed
+
+# --- KONFIGURACJA ---
+CLASSIFIER_PATH = "models/output_herbert/model-best"
+QUANTIZE_MARKER = "quantization.json"   # plik w katalogu modelu włączający kwantyzację int8 przy ładowaniu
+GRAMMAR_MODEL = "pl_core_news_lg"
+# Komponenty potrzebne ekstrakcji (dep, ent_type, lemma_); pozostałe (np. tagger, senter) są wykluczane.
+# W pl_core_news_lg lematyzator korzysta z POS z morphologizera, attribute_ruler może poprawiać lematy.
+GRAMMAR_COMPONENTS = ["tok2vec", "morphologizer", "parser", "lemmatizer", "attribute_ruler", "ner"]
+WARMUP_TEXTS = ["Policja zatrzymała wczoraj w Krakowie dwóch mężczyzn.", "To był zwykły dzień."] * 4
+
+CATEGORIES = ["BRAK_ZDARZENIA", "PRZESTEPSTWO", "POLITYKA", "BIZNES", "KATASTROFA", "WYPADEK"]
+NON_EVENT_LABEL = "BRAK_ZDARZENIA"
+
+MIN_SENTENCE_LENGTH = 5
+CAT_BATCH_SIZE = 64     # liczba zdań przekazywanych naraz do klasyfikatora
+CAT_N_PROCESS = 1       # liczba procesów dla nlp.pipe (1 = bez multiprocessingu)
+GRAM_BATCH_SIZE = 16    # liczba tekstów parsowanych naraz w analyze_many
+SENTENCE_CACHE_SIZE = 20000  # maksymalna liczba zdań w cache wyników
+
+# --- DŁUGIE DOKUMENTY ---
+LONG_CHUNK_CHARS = 10000    # maksymalna długość fragmentu (wyrównanego do akapitów) parsowanego naraz
+LONG_GRAM_BATCH_SIZE = 2    # mała paczka fragmentów - pierwsze zdania trafiają do klasyfikacji szybko
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")                 # akapity oddziela pusta linia (pojedyncze \n to zawijanie)
+SENTENCE_END = re.compile(r"[.!?…][\"'”»)]*\s+")        # koniec zdania razem z następującymi po nim białymi znakami
+
+# --- KASKADA (SZYBKI MODEL -> HERBERT) ---
+FAST_CLASSIFIER_PATH = "models/output_light/model-best"
+CASCADE_CONFIG = "models/cascade.json"  # próg dobrany przez code/cascade_tuning.py
+CASCADE_MARGIN = 0.5        # domyślny próg różnicy dwóch najwyższych wyników
+CASCADE_BLOCK_SIZE = 1024   # liczba zdań oceniana szybkim modelem przed eskalacją niepewnych
+STAGE_FAST = "fast"
+STAGE_FULL = "full"
+
+# --- ŁADOWANIE MODELI ---
+def load_classifier_model(path=CLASSIFIER_PATH, quantize=None):
+    # quantize=None: kwantyzacja tylko jeśli w katalogu modelu jest QUANTIZE_MARKER
+    try:
+        nlp = spacy.load(path)
+    except OSError:
+        return None
+    if quantize is None:
+        quantize = os.path.exists(os.path.join(path, QUANTIZE_MARKER))
+    if quantize:
+        quantize_model(nlp)
+    return nlp
+
+def quantize_model(nlp):
+    # Dynamiczna kwantyzacja int8 warstw Linear w modelach PyTorch (transformer HerBERT).
+    # Wagi int8, aktywacje liczone w locie - tylko CPU. Zwraca liczbę skwantyzowanych modeli.
+    # inplace=True podmienia warstwy w istniejącym modelu - wagi fp32 są zwalniane zamiast kopiowane,
+    # ale w trakcie ładowania proces i tak przez chwilę trzyma pełny model fp32.
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+    from thinc.api import PyTorchShim
+    count = 0
+    for _, pipe in nlp.pipeline:
+        model = getattr(pipe, "model", None)
+        if model is None:
+            continue
+        for node in model.walk():
+            for shim in node.shims:
+                if isinstance(shim, PyTorchShim):
+                    shim._model = quantize_dynamic(shim._model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+                    count += 1
+    nlp.meta["quantization"] = "qint8" if count else None
+    return count
+
+def load_cascade_config(path=CASCADE_CONFIG):
+    # {"fast_model": ścieżka, "margin": próg} albo None, jeśli kaskada nie była strojona
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def grammar_model_path(name=GRAMMAR_MODEL):
+    # Bez pobierania w trakcie działania - model musi być zainstalowany wcześniej
+    if spacy.util.is_package(name):
+        return spacy.util.get_package_path(name)
+    if Path(name).exists():
+        return Path(name)
+    raise OSError(f"Brak modelu {name} - zainstaluj go przed uruchomieniem: python -m spacy download {name}")
+
+def load_grammar_model(name=GRAMMAR_MODEL, components=GRAMMAR_COMPONENTS):
+    # components=None: pełny potok. W przeciwnym razie pozostałe komponenty są wykluczane (exclude),
+    # więc nie są nawet wczytywane z dysku - w odróżnieniu od disable.
+    path = grammar_model_path(name)
+    if components is None:
+        return spacy.load(name)
+    meta = spacy.util.load_meta(path / "meta.json")
+    exclude = [c for c in meta.get("components", meta.get("pipeline", [])) if c not in components]
+    return spacy.load(name, exclude=exclude)
+
+def warm_up(*nlps):
+    # Pierwsze wywołanie potoku alokuje bufory i inicjalizuje wątki - robimy to przy starcie
+    for nlp in nlps:
+        if nlp is not None:
+            list(nlp.pipe(WARMUP_TEXTS))
+
+# --- WĄTKI ---
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+def set_child_threads(threads):
+    # Pule BLAS/OpenMP czytają te zmienne przy imporcie numpy/torch, więc w bieżącym procesie
+    # (już po imporcie) nic nie zmieniają - działają dla procesów "spawn", które dziedziczą os.environ.
+    # Wywoływać przed utworzeniem puli procesów.
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+def set_torch_threads(threads):
+    # Limit wątków torch można zmienić w trakcie działania - wywoływać w procesie roboczym
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    # ru_maxrss jest w KB na Linuksie i w bajtach na macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def current_rss_mb():
+    # Bieżące (nie szczytowe) RSS - do porównania pamięci modeli po załadowaniu
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return float("nan")
+
+class StartupLog:
+    # Czasy kolejnych kroków startu i szczytowe RSS - wypisywane jedną linią
+    def __init__(self):
+        self.timings = {}
+        self.last = time.perf_counter()
+
+    def step(self, name):
+        now = time.perf_counter()
+        self.timings[name] = now - self.last
+        self.last = now
+
+    def summary(self):
+        steps = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.timings.items())
+        return f"Start: {steps}, razem {sum(self.timings.values()):.2f}s, RSS {peak_rss_mb():.0f} MB"
+
+def model_id(nlp):
+    # Nazwa i wersja modelu (z dopiskiem kwantyzacji) - część klucza cache wyników
+    version = f"{nlp.meta.get('name', '')}-{nlp.meta.get('version', '')}"
+    if nlp.meta.get("quantization"):
+        version += f"-{nlp.meta['quantization']}"
+    return version
+
+# --- PODZIAŁ DŁUGICH TEKSTÓW ---
+def split_into_chunks(text, max_chars=LONG_CHUNK_CHARS):
+    # Fragmenty złożone z całych akapitów (oddzielonych pustą linią) - zdanie zawinięte w kilku liniach
+    # nie jest rozcinane. Akapit dłuższy niż max_chars dzielony na końcu zdania. "".join(fragmenty) == text.
+    chunk, size = [], 0
+    for paragraph in _paragraphs(text):
+        for part in _split_paragraph(paragraph, max_chars):
+            if chunk and size + len(part) > max_chars:
+                yield "".join(chunk)
+                chunk, size = [], 0
+            chunk.append(part)
+            size += len(part)
+    if chunk:
+        yield "".join(chunk)
+
+def _paragraphs(text):
+    # Akapity razem z kończącym je odstępem
+    start = 0
+    for match in PARAGRAPH_BREAK.finditer(text):
+        yield text[start:match.end()]
+        start = match.end()
+    if start < len(text):
+        yield text[start:]
+
+def _split_paragraph(paragraph, max_chars):
+    while len(paragraph) > max_chars:
+        cut = 0
+        for match in SENTENCE_END.finditer(paragraph, 0, max_chars):
+            cut = match.end()
+        if cut == 0:
+            # Zdanie dłuższe niż max_chars - cięcie na ostatnim białym znaku, a w ostateczności twardo
+            cut = max(paragraph.rfind(" ", 0, max_chars), paragraph.rfind("\n", 0, max_chars)) + 1
+        if cut <= 0:
+            cut = max_chars
+        yield paragraph[:cut]
+        paragraph = paragraph[cut:]
+    if paragraph:
+        yield paragraph
+
+# --- STATYSTYKI ---
+def new_stats():
+    return {label: 0 for label in CATEGORIES}
+
+def update_stats(stats, record):
+    if record["label"] in stats:
+        stats[record["label"]] += 1
+    return stats
+
+def score_margin(scores):
+    # Różnica między najwyższym a drugim wynikiem - miara pewności klasyfikatora
+    top = sorted(scores.values(), reverse=True)
+    return top[0] - top[1] if len(top) > 1 else 1.0
+
+# --- CACHE WYNIKÓW ZDAŃ (LRU) ---
+class SentenceCache:
+    # Klucz: (wersja modeli, tekst zdania). Wartość: etykieta, pewność, wyniki i szczegóły.
+    def __init__(self, max_size=SENTENCE_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+                "max_size": self.max_size
+            }
+
+# --- SILNIK ANALIZY ---
+class EventAnalyzer:
+    # Ładuje oba modele raz i udostępnia analizę tekstów bez zależności od UI.
+    # Każdy rekord: {"text", "label", "score", "scores_full", "details", "stage"}.
+    # Z szybkim modelem (nlp_fast) działa kaskadowo: do HerBERTa trafiają tylko zdania,
+    # dla których szybki model ma różnicę dwóch najwyższych wyników poniżej margin.
+    # startup: opcjonalny opis czasu ładowania modeli (gdy ładował je wywołujący).
+
+    def __init__(self, nlp_cat=None, nlp_gram=None,
+                 classifier_path=CLASSIFIER_PATH, grammar_model=GRAMMAR_MODEL,
+                 batch_size=CAT_BATCH_SIZE, n_process=CAT_N_PROCESS, extractor=None, cache=None,
+                 nlp_fast=None, margin=CASCADE_MARGIN, startup=None):
+        if nlp_cat is None:
+            nlp_cat = load_classifier_model(classifier_path)
+        if nlp_cat is None:
+            raise OSError(f"Brak modelu klasyfikatora: {classifier_path}")
+        if nlp_gram is None:
+            nlp_gram = load_grammar_model(grammar_model)
+
+        self.nlp_cat = nlp_cat
+        self.nlp_gram = nlp_gram
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.extractor = extractor or EventExtractor(nlp_gram.vocab)
+        self.cache = cache
+        self.nlp_fast = nlp_fast
+        self.margin = margin
+        self.startup = startup          # podsumowanie startu (StartupLog.summary()) do wyświetlenia w UI
+        models = (nlp_cat, nlp_gram) if nlp_fast is None else (nlp_cat, nlp_gram, nlp_fast)
+        self.model_version = "|".join(model_id(nlp) for nlp in models)
+        if nlp_fast is not None:
+            self.model_version += f"|margin-{margin}"
+        self.share_tokens = self._shares_tokens(nlp_cat)
+        self.share_tokens_fast = nlp_fast is not None and self._shares_tokens(nlp_fast)
+
+    def _shares_tokens(self, nlp):
+        # Tokeny z parsowania gramatycznego można podać klasyfikatorowi bezpośrednio,
+        # jeśli oba potoki tokenizują tak samo (ten sam język i tokenizer)
+        return (
+            nlp.lang == self.nlp_gram.lang
+            and nlp.config["nlp"]["tokenizer"] == self.nlp_gram.config["nlp"]["tokenizer"]
+        )
+
+    # timer: opcjonalny profiling.StageTimer - czasy etapów parse / classify(_fast) / extract.
+    # Bez timera ścieżka jest taka sama jak bez instrumentacji.
+
+    def analyze(self, text, timer=None):
+        docs = timed(timer, "parse", (self.nlp_gram(t) for t in [text]))
+        for _, record in self._analyze_docs(enumerate(docs), timer):
+            yield record
+
+    def analyze_long(self, text, max_chars=LONG_CHUNK_CHARS, timer=None):
+        # Długi tekst parsowany fragmentami: pamięć ograniczona do kilku fragmentów naraz,
+        # a zdania z gotowych fragmentów idą do klasyfikacji, zanim kolejne zostaną sparsowane
+        chunks = split_into_chunks(text, max_chars)
+        for record in self.analyze_many(chunks, gram_batch_size=LONG_GRAM_BATCH_SIZE, timer=timer):
+            del record["doc_index"]
+            yield record
+
+    def analyze_many(self, texts, gram_batch_size=GRAM_BATCH_SIZE, timer=None):
+        # Rekordy zawierają dodatkowo "doc_index" - pozycję tekstu na wejściu
+        docs = enumerate(timed(timer, "parse", self.nlp_gram.pipe(texts, batch_size=gram_batch_size)))
+        for doc_index, record in self._analyze_docs(docs, timer):
+            record["doc_index"] = doc_index
+            yield record
+
+    def analyze_sentences(self, texts, gram_batch_size=GRAM_BATCH_SIZE, timer=None):
+        # Każdy tekst traktowany jako jedno zdanie - jeden rekord na wejście, bez filtrowania
+        docs_gram = self.nlp_gram.pipe((str(text or "") for text in texts), batch_size=gram_batch_size)
+        docs_gram, docs_for_cat = itertools.tee(timed(timer, "parse", docs_gram))
+        decisions = self._classify((doc_gram[:] for doc_gram in docs_for_cat), timer)
+        for doc_gram, (scores, stage) in zip(docs_gram, decisions):
+            yield self._record(doc_gram.text.strip(), scores, self._extract(doc_gram, timer), stage)
+
+    def _extract(self, span, timer):
+        if timer is None:
+            return self.extractor(span)
+        with timer.stage("extract"):
+            return self.extractor(span)
+
+    def _classify(self, spans, timer=None):
+        # Zwraca (wyniki, etap) dla kolejnych fragmentów, w kolejności wejścia
+        if self.nlp_fast is None:
+            docs_cat = self.nlp_cat.pipe(
+                (self._cat_input(span, self.nlp_cat, self.share_tokens) for span in spans),
+                batch_size=self.batch_size,
+                n_process=self.n_process
+            )
+            for doc_cat in timed(timer, "classify", docs_cat):
+                yield doc_cat.cats, STAGE_FULL
+            return
+
+        # Kaskada w blokach: szybki model ocenia cały blok, niepewne zdania idą do HerBERTa
+        spans = iter(spans)
+        while True:
+            block = list(itertools.islice(spans, CASCADE_BLOCK_SIZE))
+            if not block:
+                return
+            fast_scores = [doc.cats for doc in timed(timer, "classify_fast", self.nlp_fast.pipe(
+                (self._cat_input(span, self.nlp_fast, self.share_tokens_fast) for span in block),
+                batch_size=self.batch_size
+            ))]
+            uncertain = [i for i, scores in enumerate(fast_scores) if score_margin(scores) < self.margin]
+            docs_cat = self.nlp_cat.pipe(
+                (self._cat_input(block[i], self.nlp_cat, self.share_tokens) for i in uncertain),
+                batch_size=self.batch_size,
+                n_process=self.n_process
+            )
+            full_scores = {i: doc_cat.cats for i, doc_cat in zip(uncertain, timed(timer, "classify", docs_cat))}
+            for i, scores in enumerate(fast_scores):
+                if i in full_scores:
+                    yield full_scores[i], STAGE_FULL
+                else:
+                    yield scores, STAGE_FAST
+
+    def _cat_input(self, span, nlp, share_tokens):
+        # Doc dla klasyfikatora zbudowany z gotowych tokenów - bez ponownej tokenizacji.
+        # Tekst wynikowy jest identyczny z span.text.strip().
+        if not share_tokens:
+            return span.text.strip()
+        start, end = 0, len(span)
+        while start < end and span[start].is_space: start += 1
+        while end > start and span[end - 1].is_space: end -= 1
+        words = [t.text for t in span[start:end]]
+        spaces = [bool(t.whitespace_) for t in span[start:end]]
+        if spaces:
+            spaces[-1] = False
+        return Doc(nlp.vocab, words=words, spaces=spaces)
+
+    def _candidates(self, docs):
+        for doc_index, doc in docs:
+            for sent in doc.sents:
+                sent_text = sent.text.strip()
+                if len(sent_text) < MIN_SENTENCE_LENGTH: continue
+                yield doc_index, sent, sent_text
+
+    def _lookup(self, candidates):
+        for doc_index, sent, sent_text in candidates:
+            cached = self.cache.get((self.model_version, sent_text)) if self.cache is not None else None
+            yield doc_index, sent, sent_text, cached
+
+    def _analyze_docs(self, docs, timer=None):
+        candidates, to_classify = itertools.tee(self._lookup(self._candidates(docs)))
+
+        # Klasyfikacja (wsadowo) - tylko zdania, których nie ma w cache
+        decisions = self._classify((sent for _, sent, _, cached in to_classify if cached is None), timer)
+
+        for doc_index, sent, sent_text, cached in candidates:
+            if cached is not None:
+                if timer is not None:
+                    timer.count("cache_hit")
+                label, score, scores, details, stage = cached
+                yield doc_index, {
+                    "text": sent_text,
+                    "label": label,
+                    "score": score,
+                    "scores_full": dict(scores),
+                    "details": dict(details),
+                    "stage": stage
+                }
+                continue
+
+            scores, stage = next(decisions)
+            # Ekstrakcja bezpośrednio na fragmencie zdania - bez kopiowania do nowego Doc
+            details = self._extract(sent, timer)
+            record = self._record(sent_text, scores, details, stage)
+            if self.cache is not None:
+                self.cache.put(
+                    (self.model_version, sent_text),
+                    (record["label"], record["score"], dict(record["scores_full"]), dict(details), stage)
+                )
+            yield doc_index, record
+
+    def _record(self, text, scores, details, stage=STAGE_FULL):
+        best_label = max(scores, key=scores.get)
+        return {
+            "text": text,
+            "label": best_label,
+            "score": scores[best_label],
+            "scores_full": scores,
+            "details": details,
+            "stage": stage
+        }
@@ -0,0 +1,209 @@
+import heapq
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# --- KONFIGURACJA ---
+EVENT_STORE_PATH = "data/events.sqlite"
+DEFAULT_LIMIT = 100
+WRITE_TIMEOUT = 30.0    # sekundy oczekiwania na zapis zablokowany przez inny proces
+# Przyimki na początku GDZIE/KIEDY/KTO ("w Krakowie" -> "krakowie"), żeby wyszukiwanie prefiksem działało
+LEADING_PREPOSITIONS = {"w", "we", "na", "do", "z", "ze", "pod", "przy", "o", "od", "u", "po", "nad", "za", "przed", "koło", "obok"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    label TEXT NOT NULL,
+    score REAL NOT NULL,
+    trigger TEXT,
+    kto TEXT, co TEXT, gdzie TEXT, kiedy TEXT,
+    kto_norm TEXT, gdzie_norm TEXT, kiedy_norm TEXT,
+    created_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS events_source_position ON events(source, position);
+CREATE INDEX IF NOT EXISTS events_label_score ON events(label, score);
+CREATE INDEX IF NOT EXISTS events_label_trigger ON events(label, trigger);
+CREATE INDEX IF NOT EXISTS events_label_gdzie ON events(label, gdzie_norm);
+CREATE INDEX IF NOT EXISTS events_label_kiedy ON events(label, kiedy_norm);
+CREATE INDEX IF NOT EXISTS events_label_kto ON events(label, kto_norm);
+CREATE INDEX IF NOT EXISTS events_label_created ON events(label, created_at, id);
+CREATE INDEX IF NOT EXISTS events_created_id ON events(created_at, id);
+DROP INDEX IF EXISTS events_created;
+"""
+# Etykiet jest kilka, więc po ANALYZE SQLite używa indeksów (label, X) także bez filtra etykiety (skip-scan).
+# Wyniki są sortowane po (created_at, id) - ten porządek mają indeksy okresu, więc LIMIT nie wymaga sortowania.
+
+# Pełnotekstowy indeks zdań po fold() - "zlodziej" znajdzie "Złodziej" (unicode61 nie zamienia "ł" na "l").
+# Tabela bez treści (content=''): przechowuje tylko indeks, tekst jest w events.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(text, content='');
+"""
+
+# --- NORMALIZACJA ---
+def fold(value):
+    # Małe litery bez polskich znaków: "Łódź" -> "lodz"
+    value = unicodedata.normalize("NFKD", value.lower().replace("ł", "l"))
+    return "".join(ch for ch in value if not unicodedata.combining(ch))
+
+def normalize(value):
+    # "-" (brak wartości) -> None; fold() bez interpunkcji i początkowego przyimka
+    if not value or value == "-":
+        return None
+    words = re.sub(r"[^\w\s]", " ", fold(value)).split()
+    if len(words) > 1 and words[0] in LEADING_PREPOSITIONS:
+        words = words[1:]
+    return " ".join(words) or None
+
+def _prefix_range(column, prefix, conditions, params):
+    # Zapytanie prefiksowe jako zakres - korzysta z indeksu niezależnie od ustawień LIKE
+    conditions.append(f"{column} >= ? AND {column} < ?")
+    params.extend([prefix, prefix + "\uffff"])
+
+def _slot(details, field):
+    # Brak wartości ("-" z ekstraktora) zapisywany jako NULL - tak samo dla wszystkich pól
+    value = details.get(field)
+    return None if not value or value == "-" else value
+
+# --- MAGAZYN ZDARZEŃ ---
+class EventStore:
+    def __init__(self, path=EVENT_STORE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        # Aplikacja i process_corpus --store mogą pisać naraz - drugi czeka na blokadę zapisu
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=WRITE_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite bez FTS5 - wyszukiwanie tekstu przez LIKE (bez indeksu)
+            self.has_fts = False
+        self.conn.commit()
+
+    def add_records(self, records, source, start_position=0, created_at=None):
+        # records: rekordy EventAnalyzer ({"text", "label", "score", "details", ...}).
+        # (source, position) jest unikalne - ponowny zapis tych samych wyników jest ignorowany.
+        created_at = time.time() if created_at is None else created_at
+        rows = []
+        for position, record in enumerate(records, start_position):
+            details = record["details"]
+            rows.append((
+                source, position, record["text"], record["label"], float(record["score"]),
+                _slot(details, "TRIGGER"),
+                _slot(details, "KTO"), _slot(details, "CO"), _slot(details, "GDZIE"), _slot(details, "KIEDY"),
+                normalize(details.get("KTO")), normalize(details.get("GDZIE")), normalize(details.get("KIEDY")),
+                created_at
+            ))
+        with self.lock, self.conn:
+            # Blokada zapisu przed odczytem MAX(id) - inny proces nie wstawi wierszy pomiędzy
+            self.conn.execute("BEGIN IMMEDIATE")
+            last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO events (source, position, text, label, score, trigger, kto, co, gdzie, kiedy, "
+                "kto_norm, gdzie_norm, kiedy_norm, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            added = self.conn.total_changes - before
+            if self.has_fts and added:
+                # Nowe wiersze mają największe id - indeksujemy tylko je
+                new_rows = self.conn.execute("SELECT id, text FROM events WHERE id > ?", (last_id,))
+                self.conn.executemany(
+                    "INSERT INTO events_fts(rowid, text) VALUES (?, ?)", ((i, fold(text)) for i, text in new_rows.fetchall())
+                )
+        return added
+
+    def optimize(self):
+        # Przybliżone statystyki dla planera (szybkie także przy milionach wierszy) - po większym zapisie
+        with self.lock:
+            self.conn.execute("PRAGMA analysis_limit=1000")
+            self.conn.execute("ANALYZE")
+
+    # --- ZAPYTANIA ---
+    def _where(self, text=None, label=None, min_score=None, trigger=None, kto=None, gdzie=None, kiedy=None,
+               source=None, since=None, until=None):
+        conditions, params = [], []
+        if text:
+            if self.has_fts:
+                # Każde słowo jako prefiks, wszystkie wymagane; sama interpunkcja nie tworzy warunku
+                words = [word for word in re.findall(r"\w+", fold(text)) if any(ch.isalnum() for ch in word)]
+                if words:
+                    conditions.append("id IN (SELECT rowid FROM events_fts WHERE events_fts MATCH ?)")
+                    params.append(" ".join(f'"{word}"*' for word in words))
+            else:
+                conditions.append("text LIKE ?")
+                params.append(f"%{text}%")
+        if label:
+            labels = [label] if isinstance(label, str) else list(label)
+            conditions.append(f"label IN ({', '.join('?' * len(labels))})")
+            params.extend(labels)
+        if min_score is not None:
+            conditions.append("score >= ?")
+            params.append(min_score)
+        if trigger:
+            conditions.append("trigger = ?")
+            params.append(trigger)
+        for column, value in (("kto_norm", kto), ("gdzie_norm", gdzie), ("kiedy_norm", kiedy)):
+            value = normalize(value)
+            if value:
+                _prefix_range(column, value, conditions, params)
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def search(self, limit=DEFAULT_LIMIT, offset=0, label=None, **filters):
+        # Najnowsze najpierw; filtry jak w _where (text, label, min_score, trigger, kto, gdzie, kiedy, ...).
+        # Przy kilku etykietach osobne zapytanie na etykietę (każde czyta indeks (label, created_at, id)
+        # w kolejności wyniku) i scalanie - bez sortowania wszystkich pasujących wierszy.
+        # Z wyszukiwaniem tekstu jedno zapytanie: sortowane są tylko trafienia FTS.
+        if isinstance(label, str) or not label or filters.get("text"):
+            labels = [label]
+        else:
+            labels = list(label)
+        parts = []
+        with self.lock:
+            for one_label in labels:
+                where, params = self._where(label=one_label, **filters)
+                cursor = self.conn.execute(
+                    "SELECT id, source, position, text, label, score, trigger, kto, co, gdzie, kiedy, created_at "
+                    f"FROM events{where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                    params + [offset + limit]
+                )
+                columns = [c[0] for c in cursor.description]
+                parts.append([dict(zip(columns, row)) for row in cursor.fetchall()])
+        merged = heapq.merge(*parts, key=lambda event: (event["created_at"], event["id"]), reverse=True)
+        return list(merged)[offset : offset + limit]
+
+    def size(self):
+        # Liczba zdarzeń bez skanowania tabeli: wiersze nie są usuwane, a pominięte (OR IGNORE) nie zużywają id
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+
+    def label_counts(self, **filters):
+        where, params = self._where(**filters)
+        with self.lock:
+            return dict(self.conn.execute(f"SELECT label, COUNT(*) FROM events{where} GROUP BY label", params).fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.execute("PRAGMA optimize")
+            self.conn.close()
@@ -0,0 +1,113 @@
+from spacy.matcher import DependencyMatcher
+
+# --- TABLICE ETYKIET ---
+SLOTS = ("TRIGGER", "KTO", "CO", "GDZIE", "KIEDY")
+EMPTY = "-"
+
+PLACE_LABELS = frozenset({"placeName", "geogName", "GPE", "LOC"})
+TIME_LABELS = frozenset({"date", "time"})
+TIME_WORDS = ("wczoraj", "dziś", "jutro", "roku")
+LOCATIVE_PREPOSITIONS = frozenset({"w", "na"})
+
+# Relacja dziecka ROOT -> wypełniany slot (późniejsze dziecko nadpisuje wcześniejsze)
+DEP_SLOTS = {"nsubj": "KTO", "obj": "CO", "nsubj:pass": "CO"}
+
+def subtree_text(token):
+    return " ".join([t.text for t in token.subtree])
+
+# --- EKSTRAKTOR ---
+class EventExtractor:
+    # Etykiety zależności i encji porównywane jako identyfikatory z vocab (int),
+    # tekst poddrzewa budowany tylko dla dziecka, które faktycznie wypełnia slot.
+    #
+    # patterns: {slot: [wzorzec DependencyMatcher, ...]} - dodatkowe reguły bez nowych
+    # gałęzi w kodzie. Slot dostaje tekst poddrzewa OSTATNIEGO węzła wzorca i jest
+    # wypełniany tylko wtedy, gdy reguły wbudowane go nie wypełniły.
+
+    def __init__(self, vocab, dep_slots=DEP_SLOTS, place_labels=PLACE_LABELS,
+                 time_labels=TIME_LABELS, patterns=None):
+        strings = vocab.strings
+        self.root_dep = strings.add("ROOT")
+        self.obl_dep = strings.add("obl")
+        self.dep_slots = {strings.add(dep): slot for dep, slot in dep_slots.items()}
+        self.place_labels = frozenset(strings.add(label) for label in place_labels)
+        self.time_labels = frozenset(strings.add(label) for label in time_labels)
+
+        self.slots = SLOTS
+        self.matcher = None
+        if patterns:
+            self.matcher = DependencyMatcher(vocab)
+            for slot, slot_patterns in patterns.items():
+                self.matcher.add(slot, slot_patterns)
+            self.slots = SLOTS + tuple(slot for slot in patterns if slot not in SLOTS)
+
+    def __call__(self, doc):
+        # doc: Doc albo Span (np. zdanie z doc.sents)
+        data = dict.fromkeys(self.slots, EMPTY)
+        root = next((token for token in doc if token.dep == self.root_dep), None)
+        if root is None:
+            return data
+        data["TRIGGER"] = root.lemma_
+
+        for child in root.children:
+            dep = child.dep
+            slot = self.dep_slots.get(dep)
+            if slot is not None:
+                data[slot] = subtree_text(child)
+            elif dep == self.obl_dep:
+                self._fill_oblique(child, data)
+
+        if data["GDZIE"] == EMPTY or data["KIEDY"] == EMPTY:
+            for ent in doc.ents:
+                label = ent.label
+                if label in self.place_labels and data["GDZIE"] == EMPTY:
+                    data["GDZIE"] = ent.text
+                if label in self.time_labels and data["KIEDY"] == EMPTY:
+                    data["KIEDY"] = ent.text
+
+        if self.matcher is not None:
+            self._fill_patterns(doc, data)
+        return data
+
+    def _fill_oblique(self, child, data):
+        # Jedno przejście po poddrzewie zbiera wszystkie cechy potrzebne do decyzji
+        has_place = has_time = has_preposition = False
+        tokens = list(child.subtree)
+        last = len(tokens) - 1
+        for i, token in enumerate(tokens):
+            ent_type = token.ent_type
+            if ent_type:
+                if ent_type in self.place_labels:
+                    has_place = True
+                elif ent_type in self.time_labels:
+                    has_time = True
+            text = token.text
+            if not has_time and any(w in text for w in TIME_WORDS):
+                has_time = True
+            # Odpowiednik " w " in " " + tekst_poddrzewa: przyimek, po którym jest jeszcze token
+            if i < last and text in LOCATIVE_PREPOSITIONS:
+                has_preposition = True
+
+        if has_place:
+            data["GDZIE"] = " ".join([t.text for t in tokens])
+        elif has_time:
+            data["KIEDY"] = " ".join([t.text for t in tokens])
+        elif has_preposition and data["GDZIE"] == EMPTY:
+            data["GDZIE"] = " ".join([t.text for t in tokens])
+
+    def _fill_patterns(self, doc, data):
+        strings = doc.vocab.strings
+        for match_id, token_ids in self.matcher(doc):
+            slot = strings[match_id]
+            if data[slot] == EMPTY:
+                data[slot] = subtree_text(doc[token_ids[-1]])
+
+# --- FUNKCJA EKSTRAKCJI ---
+_extractors = {}
+
+def extract_details(doc):
+    # Domyślny ekstraktor, tworzony raz dla każdego vocab
+    entry = _extractors.get(id(doc.vocab))
+    if entry is None or entry[0] is not doc.vocab:
+        entry = _extractors[id(doc.vocab)] = (doc.vocab, EventExtractor(doc.vocab))
+    return entry[1](doc)
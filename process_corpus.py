@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from engine import EventAnalyzer, CLASSIFIER_PATH, GRAMMAR_MODEL, CAT_BATCH_SIZE, set_child_threads, set_torch_threads
+from extraction import SLOTS
+from profiling import StageTimer, log_stages
+from event_store import EventStore
+
+# --- KONFIGURACJA ---
+TEXT_FIELD = "Zdanie"
+CHUNK_SIZE = 512            # liczba zdań w jednym zadaniu dla workera
+MAX_PENDING_PER_WORKER = 2  # ile zadań naraz może czekać na jednego workera
+PART_PATTERN = re.compile(r"^part-(\d+)\.parquet$")
+
+# --- WORKER ---
+_analyzer = None
+
+def init_worker(classifier_path, grammar_model, batch_size, threads):
+    # Zmienne BLAS/OpenMP ustawia run() przed utworzeniem puli - tutaj numpy jest już zaimportowane
+    global _analyzer
+    if threads:
+        set_torch_threads(threads)
+    _analyzer = EventAnalyzer(
+        classifier_path=classifier_path,
+        grammar_model=grammar_model,
+        batch_size=batch_size
+    )
+
+def process_chunk(objects, text_field=TEXT_FIELD, profile_stages=False):
+    # Zwraca (wiersze, czasy etapów albo None)
+    timer = StageTimer() if profile_stages else None
+    texts = (obj.get(text_field, "") for obj in objects)
+    output = []
+    for obj, record in zip(objects, _analyzer.analyze_sentences(texts, timer=timer)):
+        row = dict(obj)
+        row["Etykieta"] = record["label"]
+        row["Pewnosc"] = record["score"]
+        row.update(record["details"])
+        output.append(row)
+    return output, timer.report() if timer else None
+
+# --- ODCZYT WEJŚCIA (STRUMIENIOWO) ---
+def read_chunks(path, start_offset, chunk_size):
+    # Zwraca (offset_po_chunku, liczba_linii, obiekty) - offset w bajtach pliku wejściowego
+    with open(path, 'rb') as f:
+        f.seek(start_offset)
+        offset = start_offset
+        lines = 0
+        objects = []
+        for line in f:
+            offset += len(line)
+            lines += 1
+            line = line.strip()
+            if line:
+                objects.append(json.loads(line))
+            if len(objects) >= chunk_size:
+                yield offset, lines, objects
+                lines = 0
+                objects = []
+        if lines:
+            yield offset, lines, objects
+
+# --- ZAPIS WYNIKÓW ---
+class JsonlWriter:
+    def __init__(self, path, checkpoint):
+        self.path = path
+        mode = 'r+b' if checkpoint and os.path.exists(path) else 'wb'
+        self.f = open(path, mode)
+        # Ucinamy ewentualnie niedokończony zapis sprzed przerwania
+        self.f.truncate(checkpoint.get("output_offset", 0) if checkpoint else 0)
+        self.f.seek(0, os.SEEK_END)
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps(row, ensure_ascii=False).encode('utf-8'))
+            self.f.write(b"\n")
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return {"output_offset": self.f.tell()}
+
+    def close(self):
+        self.f.close()
+
+class ParquetWriter:
+    # Każdy zapisany chunk to osobny plik part-XXXXX.parquet w katalogu wyjściowym.
+    # Wszystkie części mają jeden schemat: kolumny wyniku z typami ustalonymi z góry, pozostałe
+    # pola wejścia typowane z pierwszej części (przy wznowieniu schemat czytany z part-00000).
+    def __init__(self, path, checkpoint, text_field=TEXT_FIELD):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Zapis do Parquet wymaga pakietu pyarrow")
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.text_field = text_field
+        self.parts = checkpoint.get("parts", 0) if checkpoint else 0
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            match = PART_PATTERN.match(name)
+            if match and int(match.group(1)) >= self.parts:
+                os.remove(os.path.join(path, name))
+        self.schema = self.pq.read_schema(self._part_path(0)) if self.parts else None
+
+    def _part_path(self, part):
+        return os.path.join(self.path, f"part-{part:05d}.parquet")
+
+    def _build_schema(self, rows):
+        known = {self.text_field: self.pa.string(), "Etykieta": self.pa.string(), "Pewnosc": self.pa.float64()}
+        known.update((slot, self.pa.string()) for slot in SLOTS)
+        inferred = self.pa.Table.from_pylist(rows).schema
+        fields = [self.pa.field(f.name, known.get(f.name, f.type)) for f in inferred]
+        # Kolumna bez żadnej wartości w pierwszej części (typ null) - zapisywana jako tekst
+        return self.pa.schema([f.with_type(self.pa.string()) if self.pa.types.is_null(f.type) else f for f in fields])
+
+    def write(self, rows):
+        # Chunk bez wierszy nie tworzy pliku - part-00000 zawsze niesie schemat
+        if not rows:
+            return {"parts": self.parts}
+        if self.schema is None:
+            self.schema = self._build_schema(rows)
+        table = self.pa.Table.from_pylist(rows, schema=self.schema)
+        self.pq.write_table(table, self._part_path(self.parts))
+        self.parts += 1
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+# --- CHECKPOINT ---
+def input_signature(path):
+    # Checkpoint pamięta offset w bajtach - wznowienie ma sens tylko dla tego samego, niezmienionego pliku
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+def output_intact(args, checkpoint):
+    # Wyniki sprzed przerwania muszą nadal istnieć - inaczej wznowienie zgubiłoby wiersze
+    if args.format == "parquet":
+        return all(os.path.exists(os.path.join(args.output, f"part-{part:05d}.parquet"))
+                   for part in range(checkpoint.get("parts", 0)))
+    return os.path.isfile(args.output) and os.path.getsize(args.output) >= checkpoint.get("output_offset", 0)
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_checkpoint(path, state):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+# --- GŁÓWNA PĘTLA ---
+def run(args):
+    checkpoint_path = args.checkpoint or args.output + ".ckpt"
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else None
+    signature = input_signature(args.input)
+    if checkpoint and checkpoint.get("input") != signature:
+        raise SystemExit(f"Checkpoint {checkpoint_path} dotyczy innego lub zmienionego pliku wejściowego "
+                         f"- użyj --no-resume, żeby zacząć od początku")
+    if checkpoint and not output_intact(args, checkpoint):
+        print(f"Brak wyników poprzedniego przebiegu w {args.output} - zaczynam od początku")
+        checkpoint = None
+    if checkpoint:
+        print(f"Wznawianie od linii {checkpoint['lines']} (offset {checkpoint['input_offset']})")
+
+    if args.format == "parquet":
+        writer = ParquetWriter(args.output, checkpoint, args.text_field)
+    else:
+        writer = JsonlWriter(args.output, checkpoint)
+
+    state = checkpoint or {"input": signature, "input_offset": 0, "lines": 0}
+    state.setdefault("rows", 0)
+    chunks = read_chunks(args.input, state["input_offset"], args.chunk_size)
+
+    # Log etapów: jedna linia JSON na chunk (czasy sumowane po procesach roboczych)
+    stage_log = open(args.stage_log, 'a', encoding='utf-8') if args.stage_log else None
+    profile_stages = stage_log is not None
+    # Baza zdarzeń: (plik wejściowy, numer wiersza) jest unikalne, więc chunk zapisany
+    # przed przerwaniem i przetworzony ponownie po wznowieniu nie tworzy duplikatów
+    store = EventStore(args.store) if args.store else None
+    started = time.perf_counter()
+
+    def commit(offset, lines, result):
+        rows, stages = result
+        state.update(writer.write(rows))
+        if store is not None:
+            records = ({"text": row.get(args.text_field, ""), "label": row["Etykieta"], "score": row["Pewnosc"],
+                        "details": row} for row in rows)
+            store.add_records(records, source=args.input, start_position=state["rows"])
+        state["input_offset"] = offset
+        state["lines"] += lines
+        state["rows"] += len(rows)
+        save_checkpoint(checkpoint_path, state)
+        print(f"Przetworzono {state['lines']} linii")
+        if stage_log is not None:
+            timer = StageTimer()
+            timer.merge(stages)
+            log_stages(stage_log, timer, source="process_corpus", rows=len(rows),
+                       lines_total=state["lines"], elapsed=time.perf_counter() - started)
+
+    try:
+        if args.workers <= 0:
+            init_worker(args.classifier, args.grammar, args.batch_size, 0)
+            for offset, lines, objects in chunks:
+                commit(offset, lines, process_chunk(objects, args.text_field, profile_stages))
+        else:
+            if args.threads_per_worker:
+                set_child_threads(args.threads_per_worker)
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(
+                max_workers=args.workers,
+                mp_context=ctx,
+                initializer=init_worker,
+                initargs=(args.classifier, args.grammar, args.batch_size, args.threads_per_worker)
+            ) as pool:
+                # Ograniczona liczba zadań w locie - pamięć nie rośnie z rozmiarem korpusu
+                pending = deque()
+                max_pending = args.workers * MAX_PENDING_PER_WORKER
+                for offset, lines, objects in chunks:
+                    pending.append((offset, lines, pool.submit(process_chunk, objects, args.text_field, profile_stages)))
+                    while len(pending) >= max_pending:
+                        offset_done, lines_done, future = pending.popleft()
+                        commit(offset_done, lines_done, future.result())
+                while pending:
+                    offset_done, lines_done, future = pending.popleft()
+                    commit(offset_done, lines_done, future.result())
+    finally:
+        writer.close()
+        if stage_log is not None:
+            stage_log.close()
+        if store is not None:
+            store.optimize()
+            store.close()
+
+    print(f"\nZakończono. Wyniki: {args.output}")
+    if args.store:
+        print(f"Zdarzenia zapisane w bazie: {args.store}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Klasyfikacja i ekstrakcja zdarzeń dla korpusu JSONL")
+    parser.add_argument("input", help="plik JSONL z obiektami zawierającymi pole ze zdaniem")
+    parser.add_argument("output", help="plik .jsonl lub katalog na pliki .parquet")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default=None,
+                        help="format wyjścia (domyślnie na podstawie rozszerzenia)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="liczba procesów (0 = bez puli, w bieżącym procesie)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--batch-size", type=int, default=CAT_BATCH_SIZE)
+    parser.add_argument("--text-field", default=TEXT_FIELD)
+    parser.add_argument("--classifier", default=CLASSIFIER_PATH)
+    parser.add_argument("--grammar", default=GRAMMAR_MODEL)
+    parser.add_argument("--checkpoint", default=None, help="domyślnie <output>.ckpt")
+    parser.add_argument("--stage-log", default=None,
+                        help="plik JSONL z czasami etapów (parse/classify/extract) dla każdego chunku")
+    parser.add_argument("--store", default=None,
+                        help="dodatkowo zapisz wyniki do indeksowanej bazy zdarzeń SQLite (np. data/events.sqlite)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="ignoruj istniejący checkpoint i zacznij od początku")
+    args = parser.parse_args(argv)
+    if args.format is None:
+        args.format = "parquet" if args.output.endswith(".parquet") else "jsonl"
+    return args
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,118 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# --- KONFIGURACJA ---
+PROFILE_TOP = 30        # liczba funkcji w raporcie cProfile
+
+# --- POMIAR ETAPÓW ---
+class StageTimer:
+    # Czas "na wyłączność" każdego etapu: gdy etap zagnieżdżony (np. parsowanie pobierane
+    # leniwie przez klasyfikację) jest aktywny, czas etapu nadrzędnego jest wstrzymany.
+    # Liczniki to liczba elementów (dokumentów / zdań), które przeszły przez etap.
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._stack = []
+        self._mark = 0.0
+
+    def _enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            self.seconds[self._stack[-1]] += now - self._mark
+        self._stack.append(name)
+        self._mark = now
+
+    def _exit(self):
+        now = time.perf_counter()
+        self.seconds[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def stage(self, name, count=1):
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+            self.counts[name] += count
+
+    def iter(self, name, iterable):
+        # Mierzy czas każdego next() na leniwym iteratorze (np. nlp.pipe)
+        iterator = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            self.counts[name] += 1
+            yield item
+
+    def count(self, name, n=1):
+        # Sam licznik, bez pomiaru czasu (np. trafienia w cache)
+        self.counts[name] += n
+
+    def merge(self, report):
+        for name, values in report.items():
+            self.seconds[name] += values["seconds"]
+            self.counts[name] += values["count"]
+
+    def report(self):
+        names = sorted(set(self.seconds) | set(self.counts), key=lambda name: self.seconds.get(name, 0.0), reverse=True)
+        return {name: {"seconds": self.seconds.get(name, 0.0), "count": self.counts.get(name, 0)} for name in names}
+
+    def summary(self):
+        total = sum(self.seconds.values()) or 1.0
+        return ", ".join(
+            f"{name} {values['seconds']:.3f}s ({values['seconds'] / total:.0%}, {values['count']})"
+            for name, values in self.report().items()
+        )
+
+def timed(timer, name, iterable):
+    # Bez timera zwraca iterator bez zmian - zero narzutu na element
+    return iterable if timer is None else timer.iter(name, iterable)
+
+def stage_record(timer, **fields):
+    # Jedna linia JSON na przebieg - do logów i zbierania metryk
+    return json.dumps({"ts": time.time(), **fields, "stages": timer.report()}, ensure_ascii=False)
+
+def log_stages(stream, timer, **fields):
+    # Zapis linii do pliku/strumienia w trybach bez UI (np. --stage-log w process_corpus.py)
+    stream.write(stage_record(timer, **fields) + "\n")
+    stream.flush()
+
+# --- PROFILOWANIE ---
+class Profile:
+    # mode: None (wyłączone), "cprofile" albo "pyinstrument" (jeśli zainstalowany)
+    def __init__(self, mode=None):
+        self.mode = mode
+        self.text = ""
+        self._profiler = None
+
+    def __enter__(self):
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.mode == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profiler = Profiler()
+            self._profiler.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.mode == "cprofile":
+            self._profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(self._profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            self.text = output.getvalue()
+        elif self.mode == "pyinstrument":
+            self._profiler.stop()
+            self.text = self._profiler.output_text(unicode=True)
+        return False
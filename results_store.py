@@ -0,0 +1,197 @@
+import csv
+import json
+import os
+import tempfile
+from array import array
+
+import numpy as np
+
+from engine import CATEGORIES, STAGE_FAST, STAGE_FULL
+
+# --- KONFIGURACJA ---
+DETAIL_FIELDS = ["TRIGGER", "KTO", "CO", "GDZIE", "KIEDY"]
+STAGES = [STAGE_FULL, STAGE_FAST]
+EXPORT_COLUMNS = ["Zdanie", "Etykieta", "Pewnosc", "Etap"] + DETAIL_FIELDS
+INITIAL_CAPACITY = 1024
+PARQUET_BATCH_SIZE = 65536      # liczba wierszy w jednej grupie zapisu Parquet
+SCORE_FORMAT = "%.6g"           # float32 ma ~7 cyfr znaczących - bez artefaktów typu 0.699999988
+
+# --- KOLUMNA TEKSTOWA ---
+class StringColumn:
+    # Wszystkie napisy w jednym buforze UTF-8 + tablica przesunięć (jak w Arrow).
+    # Koszt napisu to jego bajty i 8 bajtów przesunięcia, bez narzutu obiektu str.
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+
+    def append(self, value):
+        self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def nbytes(self):
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+# --- MAGAZYN WYNIKÓW ---
+class ResultStore:
+    # Kolumnowy odpowiednik listy rekordów z EventAnalyzer:
+    # etykieta jako int8, macierz wyników float32 [zdania x kategorie], etap jako int8, teksty w StringColumn.
+    # with_source=True dodaje kolumnę "Dokument" (nazwa pliku źródłowego w trybie wsadowym).
+    def __init__(self, categories=CATEGORIES, with_source=False):
+        self.categories = list(categories)
+        self.category_ids = {label: i for i, label in enumerate(self.categories)}
+        self.size = 0
+        self.label_ids = np.zeros(INITIAL_CAPACITY, dtype=np.int8)
+        self.stage_ids = np.zeros(INITIAL_CAPACITY, dtype=np.int8)
+        self.scores = np.zeros((INITIAL_CAPACITY, len(self.categories)), dtype=np.float32)
+        self.text = StringColumn()
+        self.details = {field: StringColumn() for field in DETAIL_FIELDS}
+        self.source = StringColumn() if with_source else None
+        self.columns = (["Dokument"] if with_source else []) + EXPORT_COLUMNS
+
+    def _grow(self):
+        capacity = len(self.label_ids) * 2
+        self.label_ids = np.resize(self.label_ids, capacity)
+        self.stage_ids = np.resize(self.stage_ids, capacity)
+        scores = np.zeros((capacity, len(self.categories)), dtype=np.float32)
+        scores[:self.size] = self.scores[:self.size]
+        self.scores = scores
+
+    def append(self, record, source=""):
+        if self.size == len(self.label_ids):
+            self._grow()
+        i = self.size
+        self.label_ids[i] = self.category_ids[record["label"]]
+        self.stage_ids[i] = STAGES.index(record.get("stage", STAGE_FULL))
+        scores = record["scores_full"]
+        self.scores[i] = [scores.get(label, 0.0) for label in self.categories]
+        self.text.append(record["text"])
+        for field in DETAIL_FIELDS:
+            self.details[field].append(record["details"].get(field, "-"))
+        if self.source is not None:
+            self.source.append(source)
+        self.size += 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+        return self
+
+    def __len__(self):
+        return self.size
+
+    # --- ODCZYT ---
+    def label(self, i):
+        return self.categories[self.label_ids[i]]
+
+    def score(self, i):
+        return float(self.scores[i, self.label_ids[i]])
+
+    def record(self, i):
+        # Rekord w formacie EventAnalyzer - tworzony tylko dla wyświetlanych zdań
+        return {
+            "text": self.text[i],
+            "label": self.label(i),
+            "score": self.score(i),
+            "scores_full": dict(zip(self.categories, self.scores[i].tolist())),
+            "details": {field: self.details[field][i] for field in DETAIL_FIELDS},
+            "stage": STAGES[self.stage_ids[i]]
+        }
+
+    def label_counts(self):
+        counts = np.bincount(self.label_ids[:self.size], minlength=len(self.categories))
+        return dict(zip(self.categories, counts.tolist()))
+
+    def stage_count(self, stage):
+        return int(np.count_nonzero(self.stage_ids[:self.size] == STAGES.index(stage)))
+
+    def indices(self, exclude_label=None):
+        # Pozycje zdań z pominięciem jednej etykiety (np. BRAK_ZDARZENIA) - bez kopiowania rekordów
+        if exclude_label is None:
+            return np.arange(self.size)
+        return np.flatnonzero(self.label_ids[:self.size] != self.category_ids[exclude_label])
+
+    def nbytes(self):
+        return (
+            self.label_ids[:self.size].nbytes + self.stage_ids[:self.size].nbytes + self.scores[:self.size].nbytes
+            + self.text.nbytes() + sum(column.nbytes() for column in self.details.values())
+            + (self.source.nbytes() if self.source is not None else 0)
+        )
+
+    # --- EKSPORT STRUMIENIOWY ---
+    def rows(self, start=0, end=None):
+        end = self.size if end is None else min(end, self.size)
+        for i in range(start, end):
+            score = float(SCORE_FORMAT % self.score(i))
+            row = [self.text[i], self.label(i), score, STAGES[self.stage_ids[i]]] + [
+                self.details[field][i] for field in DETAIL_FIELDS
+            ]
+            yield row if self.source is None else [self.source[i]] + row
+
+    def write_csv(self, stream):
+        writer = csv.writer(stream, lineterminator="\n")
+        writer.writerow(self.columns)
+        for row in self.rows():
+            writer.writerow(row)
+
+    def write_jsonl(self, stream):
+        for row in self.rows():
+            stream.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False))
+            stream.write("\n")
+
+    def write_parquet(self, path_or_stream, batch_size=PARQUET_BATCH_SIZE):
+        # Zapis grupami wierszy - w pamięci jest co najwyżej jedna grupa w formacie Arrow
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Eksport do Parquet wymaga pakietu pyarrow")
+        schema = pa.schema(
+            ([("Dokument", pa.string())] if self.source is not None else [])
+            + [("Zdanie", pa.string()), ("Etykieta", pa.dictionary(pa.int8(), pa.string())),
+             ("Pewnosc", pa.float32()), ("Etap", pa.dictionary(pa.int8(), pa.string()))]
+            + [(field, pa.string()) for field in DETAIL_FIELDS]
+        )
+        labels = pa.array(self.categories, type=pa.string())
+        stages = pa.array(STAGES, type=pa.string())
+        with pq.ParquetWriter(path_or_stream, schema) as writer:
+            for start in range(0, self.size, batch_size):
+                end = min(start + batch_size, self.size)
+                label_ids = self.label_ids[start:end]
+                columns = [
+                    pa.array([self.text[i] for i in range(start, end)], type=pa.string()),
+                    pa.DictionaryArray.from_arrays(pa.array(label_ids, type=pa.int8()), labels),
+                    pa.array(self.scores[np.arange(start, end), label_ids], type=pa.float32()),
+                    pa.DictionaryArray.from_arrays(pa.array(self.stage_ids[start:end], type=pa.int8()), stages)
+                ] + [
+                    pa.array([self.details[field][i] for i in range(start, end)], type=pa.string())
+                    for field in DETAIL_FIELDS
+                ]
+                if self.source is not None:
+                    columns.insert(0, pa.array([self.source[i] for i in range(start, end)], type=pa.string()))
+                writer.write_batch(pa.record_batch(columns, schema=schema))
+
+    def export_file(self, fmt):
+        # Dla przycisku pobierania w app.py: "csv", "jsonl" albo "parquet".
+        # Zapis strumieniowy do pliku tymczasowego (bez kopii całego eksportu w pamięci);
+        # zwraca ścieżkę - usunięcie pliku należy do wywołującego.
+        fd, path = tempfile.mkstemp(prefix="export-", suffix=f".{fmt}")
+        os.close(fd)
+        try:
+            if fmt == "parquet":
+                self.write_parquet(path)
+            else:
+                with open(path, 'w', encoding='utf-8', newline='') as stream:
+                    if fmt == "csv":
+                        self.write_csv(stream)
+                    else:
+                        self.write_jsonl(stream)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
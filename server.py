@@ -0,0 +1,369 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from profiling import StageTimer
+from engine import (
+    EventAnalyzer, SentenceCache, StartupLog, load_classifier_model, load_grammar_model, load_cascade_config,
+    warm_up, CLASSIFIER_PATH, GRAMMAR_MODEL, CAT_BATCH_SIZE, SENTENCE_CACHE_SIZE, LONG_CHUNK_CHARS,
+    set_child_threads, set_torch_threads
+)
+
+# --- KONFIGURACJA ---
+HOST = "127.0.0.1"
+PORT = 8000
+WORKERS = 1                 # liczba procesów serwera (każdy z własnymi modelami i jednym wątkiem inferencji)
+MAX_BATCH_SIZE = 64         # maksymalna liczba zdań (classify) / tekstów (analyze) w jednej mikro-paczce
+MAX_WAIT_MS = 10            # ile najdłużej czekać na dopełnienie paczki po pierwszym żądaniu
+MAX_QUEUE = 256             # limit żądań w kolejce - powyżej serwer odpowiada 503
+REQUEST_TIMEOUT = 60        # limit czasu oczekiwania na wynik [s]
+LATENCY_WINDOW = 10000      # liczba ostatnich pomiarów opóźnienia w /metrics
+
+logger = logging.getLogger("event_server")
+
+# --- METRYKI ---
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+class Metrics:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = {"analyze": 0, "classify": 0}
+        self.rejected = 0
+        self.errors = 0
+        self.batches = 0
+        self.batch_units = 0
+        self.stages = StageTimer()                  # łączne czasy etapów analizy ze wszystkich paczek
+        self.latencies = deque(maxlen=window)       # od przyjęcia żądania do odpowiedzi
+        self.queue_waits = deque(maxlen=window)     # od przyjęcia do wzięcia przez worker
+
+    def record_request(self, kind, latency):
+        with self.lock:
+            self.requests[kind] += 1
+            self.latencies.append(latency)
+
+    def record_batch(self, units, waits):
+        with self.lock:
+            self.batches += 1
+            self.batch_units += units
+            self.queue_waits.extend(waits)
+
+    def record_stages(self, report):
+        with self.lock:
+            self.stages.merge(report)
+
+    def record_rejected(self):
+        with self.lock:
+            self.rejected += 1
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def snapshot(self, queue_depth):
+        def percentiles(values):
+            if not values:
+                return {"p50": None, "p95": None, "p99": None}
+            return {f"p{q}": percentile(values, q) * 1000 for q in (50, 95, 99)}
+
+        with self.lock:
+            return {
+                "uptime_s": time.time() - self.started,
+                "requests": dict(self.requests),
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "queue_depth": queue_depth,
+                "batches": self.batches,
+                "avg_batch_size": self.batch_units / self.batches if self.batches else 0.0,
+                "latency_ms": percentiles(list(self.latencies)),
+                "queue_wait_ms": percentiles(list(self.queue_waits)),
+                "stages": self.stages.report()
+            }
+
+# --- OGRANICZENIE WĄTKÓW ---
+def limit_threads(threads):
+    # numpy jest już zaimportowane (engine) - pule BLAS/OpenMP bieżącego procesu ograniczane w trakcie
+    # działania; procesom potomnym zmienne środowiskowe ustawia main() przed ich startem
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+    except ImportError:
+        logger.warning("Brak pakietu threadpoolctl - limit wątków BLAS działa tylko przez torch")
+    set_torch_threads(threads)
+
+# --- MIKRO-PACZKOWANIE ---
+class Job:
+    # Jedno żądanie w kolejce: "analyze" (lista tekstów) albo "classify" (lista zdań)
+    def __init__(self, kind, texts):
+        self.kind = kind
+        self.texts = texts
+        self.units = len(texts)
+        self.enqueued = time.perf_counter()
+        self.future = Future()
+
+class MicroBatcher:
+    # Jeden wątek inferencji na proces: Language/Vocab/StringStore spaCy nie są bezpieczne wątkowo
+    # (tokenizacja i Doc(nlp.vocab, ...) modyfikują wspólny vocab). Wątki HTTP tylko kolejkują żądania.
+    def __init__(self, analyzer, metrics, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, max_queue=MAX_QUEUE):
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.metrics = metrics
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.thread = threading.Thread(target=self._worker, args=(analyzer,), daemon=True, name="model")
+        self.thread.start()
+
+    def submit(self, kind, texts):
+        # queue.Full oznacza przepełnienie - obsługa (503) po stronie handlera
+        job = Job(kind, texts)
+        self.jobs.put_nowait(job)
+        return job.future
+
+    def _collect(self):
+        batch = [self.jobs.get()]
+        units = batch[0].units
+        deadline = time.perf_counter() + self.max_wait
+        while units < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = self.jobs.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(job)
+            units += job.units
+        return batch, units
+
+    def _worker(self, analyzer):
+        while True:
+            batch, units = self._collect()
+            # Żądania porzucone po przekroczeniu limitu czasu (anulowane) nie są już liczone
+            batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            units = sum(job.units for job in batch)
+            now = time.perf_counter()
+            self.metrics.record_batch(units, [now - job.enqueued for job in batch])
+            for kind in ("classify", "analyze"):
+                jobs = [job for job in batch if job.kind == kind]
+                if not jobs:
+                    continue
+                timer = StageTimer()
+                try:
+                    results = self._run(analyzer, kind, jobs, timer)
+                except Exception as e:
+                    for job in jobs:
+                        job.future.set_exception(e)
+                    continue
+                self.metrics.record_stages(timer.report())
+                for job, result in zip(jobs, results):
+                    job.future.set_result(result)
+
+    def _run(self, analyzer, kind, jobs, timer):
+        # Wszystkie teksty z paczki idą jednym wywołaniem nlp.pipe; wyniki wracają do swoich żądań
+        texts = [text for job in jobs for text in job.texts]
+        per_text = [[] for _ in texts]
+        if kind == "classify":
+            for i, record in enumerate(analyzer.analyze_sentences(texts, timer=timer)):
+                per_text[i].append(record)
+        else:
+            # Długie artykuły fragmentami (limit max_length, ograniczona pamięć), krótkie razem w jednej paczce
+            short = [i for i, text in enumerate(texts) if len(text) <= LONG_CHUNK_CHARS]
+            for record in analyzer.analyze_many((texts[i] for i in short), timer=timer):
+                per_text[short[record.pop("doc_index")]].append(record)
+            for i, text in enumerate(texts):
+                if len(text) > LONG_CHUNK_CHARS:
+                    per_text[i].extend(analyzer.analyze_long(text, timer=timer))
+
+        results, position = [], 0
+        for job in jobs:
+            records = per_text[position:position + job.units]
+            position += job.units
+            results.append([r for rs in records for r in rs] if kind == "classify" else records)
+        return results
+
+# --- HTTP ---
+class Handler(BaseHTTPRequestHandler):
+    batcher = None
+    metrics = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, self.metrics.snapshot(self.batcher.jobs.qsize()))
+        elif self.path == "/health":
+            self._send(200, {"status": "ok"})
+        else:
+            self._send(404, {"error": "Nieznana ścieżka"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        if self.path not in ("/analyze", "/classify"):
+            self._send(404, {"error": "Nieznana ścieżka"})
+            return
+        kind = self.path[1:]
+
+        # /analyze: {"text": "..."} albo {"texts": [...]}; /classify: {"sentences": [...]}
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("oczekiwano obiektu JSON")
+            if kind == "classify":
+                texts = payload["sentences"]
+            elif "texts" in payload:
+                texts = payload["texts"]
+            else:
+                texts = [payload["text"]]
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("oczekiwano listy napisów")
+        except (ValueError, KeyError) as e:
+            self._send(400, {"error": f"Niepoprawne żądanie: {e}"})
+            return
+
+        try:
+            future = self.batcher.submit(kind, texts)
+        except queue.Full:
+            self.metrics.record_rejected()
+            self._send(503, {"error": "Kolejka pełna"}, {"Retry-After": "1"})
+            return
+
+        try:
+            result = future.result(timeout=REQUEST_TIMEOUT)
+        except FutureTimeout:
+            # Zadanie jeszcze w kolejce zostaje anulowane i worker je pominie
+            future.cancel()
+            self.metrics.record_error()
+            self._send(504, {"error": "Przekroczono limit czasu"})
+            return
+        except Exception as e:
+            self.metrics.record_error()
+            self._send(500, {"error": str(e)})
+            return
+
+        if kind == "analyze" and "texts" not in payload:
+            result = result[0]
+        self.metrics.record_request(kind, time.perf_counter() - start)
+        self._send(200, {"results": result})
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128    # kolejka połączeń TCP (domyślne 5 gubi połączenia pod obciążeniem)
+    reuse_port = False
+
+    def server_bind(self):
+        if self.reuse_port:
+            # Kilka procesów nasłuchuje na tym samym porcie - jądro rozdziela między nie połączenia
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+# --- START ---
+def build_analyzer(args):
+    cache = SentenceCache(SENTENCE_CACHE_SIZE)
+    cascade = load_cascade_config() if args.cascade else None
+    startup = StartupLog()
+    nlp_cat = load_classifier_model(args.classifier)
+    if nlp_cat is None:
+        raise SystemExit(f"Brak modelu klasyfikatora: {args.classifier}")
+    startup.step("klasyfikator")
+    nlp_gram = load_grammar_model(args.grammar)
+    startup.step("gramatyka")
+    nlp_fast = load_classifier_model(cascade["fast_model"]) if cascade else None
+    if nlp_fast is not None:
+        startup.step("szybki model")
+    warm_up(nlp_cat, nlp_gram, nlp_fast)
+    startup.step("rozgrzewka")
+    logger.info(startup.summary())
+    return EventAnalyzer(
+        nlp_cat, nlp_gram,
+        batch_size=args.batch_size,
+        cache=cache,
+        nlp_fast=nlp_fast,
+        margin=cascade["margin"] if nlp_fast is not None else None,
+        startup=startup.summary()
+    )
+
+def serve(args, reuse_port=False):
+    # Jeden proces serwera: własne modele, jeden wątek inferencji, wątki HTTP; /metrics dotyczy tego procesu
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s: %(message)s")
+    if args.threads_per_worker:
+        limit_threads(args.threads_per_worker)
+
+    logger.info("Ładowanie modeli...")
+    metrics = Metrics()
+    Handler.metrics = metrics
+    Handler.batcher = MicroBatcher(build_analyzer(args), metrics, args.max_batch_size, args.max_wait_ms, args.max_queue)
+
+    Server.reuse_port = reuse_port
+    server = Server((args.host, args.port), Handler)
+    logger.info(f"Serwer działa: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serwer HTTP analizy zdarzeń z mikro-paczkowaniem")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="liczba procesów serwera na wspólnym porcie (każdy z własnymi modelami)")
+    parser.add_argument("--threads-per-worker", type=int, default=0, help="limit wątków BLAS/torch na proces (0 = bez limitu)")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="limit żądań w kolejce (powyżej 503)")
+    parser.add_argument("--batch-size", type=int, default=CAT_BATCH_SIZE, help="rozmiar paczki dla nlp.pipe")
+    parser.add_argument("--classifier", default=CLASSIFIER_PATH)
+    parser.add_argument("--grammar", default=GRAMMAR_MODEL)
+    parser.add_argument("--cascade", action="store_true", help="kaskada z progiem z models/cascade.json")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        serve(args)
+        return
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise SystemExit("--workers > 1 wymaga SO_REUSEPORT (Linux) - uruchom kilka serwerów na różnych portach")
+
+    # Skalowanie procesami zamiast wątków: brak współdzielonego stanu spaCy i blokady GIL.
+    # Procesy "spawn" dziedziczą os.environ - limit wątków BLAS ustawiany przed ich startem.
+    if args.threads_per_worker:
+        set_child_threads(args.threads_per_worker)
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(target=serve, args=(args, True), name=f"server-{i}")
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()
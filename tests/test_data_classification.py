@@ -0,0 +1,83 @@
+import asyncio
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+# Skrypty z code/ importują się nawzajem po nazwie (jak przy uruchamianiu z tego katalogu)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+
+import data_classification as dc
+from stub_llm_server import StubHandler, label_sentence
+
+SENTENCES = [
+    "Policja zatrzymała złodzieja w Krakowie",
+    "Premier odwołał ministra zdrowia",
+    "Wypadek autokaru zablokował autostradę",
+    "Słoneczny dzień nad morzem",
+]
+
+@pytest.fixture
+def stub(monkeypatch):
+    # Zaślepka API w wątku na wolnym porcie; atrybuty handlera ustawia test
+    handler = type("Handler", (StubHandler,), {"latency": 0.0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(dc, "API_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(dc, "API_KEY", "test")
+    monkeypatch.setattr(dc, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(dc, "MAX_RETRIES", 3)
+    yield handler
+    server.shutdown()
+    server.server_close()
+
+def classify(sentences):
+    async def run():
+        semaphore = asyncio.Semaphore(dc.MAX_CONCURRENT_REQUESTS)
+        bucket = dc.TokenBucket(1000.0, 1000)
+        return await dc.classify_batch_async(sentences, semaphore, bucket)
+    return asyncio.run(run())
+
+def test_classify_batch_async_returns_labels(stub):
+    results = classify(SENTENCES)
+    assert [r["label"] for r in results] == [label_sentence(s) for s in SENTENCES]
+
+@pytest.mark.parametrize("rate", ["error_rate", "truncate_rate", "malformed_rate"])
+def test_classify_batch_async_gives_up_on_bad_responses(stub, rate):
+    # Błędy HTTP, niepełne i źle zbudowane odpowiedzi to porażka paczki (None), a nie wyjątek
+    setattr(stub, rate, 1.0)
+    assert classify(SENTENCES) is None
+
+@pytest.mark.parametrize("text", ['["a", "b"]', '{"results": null}', '{"results": [1, 2]}', "null", "bez json"])
+def test_read_results_raises_single_error_type(text):
+    with pytest.raises(dc.ResponseFormatError):
+        dc.read_results(text, 2)
+
+def test_journal_is_replaced_when_input_settings_change(stub, monkeypatch, tmp_path, capsys):
+    # Pełny przebieg asynchroniczny na zaślepce; zmiana ustawień deduplikacji przesuwa paczki,
+    # więc stary dziennik nie może zostać użyty do wznowienia
+    input_path = tmp_path / "input.json"
+    sentences = SENTENCES + ["Policja zatrzymała złodzieja w Krakowie!"]
+    input_path.write_text(dc.json.dumps([{"Zdanie": s} for s in sentences], ensure_ascii=False), encoding="utf-8")
+    for name, filename in (("FILE_RAW_INPUT", "input.json"), ("FILE_CLASSIFIED", "classified.json"),
+                           ("FILE_JOURNAL", "journal.jsonl"), ("FILE_LABEL_CACHE", "cache.sqlite"),
+                           ("FILE_DEDUP_REPORT", "report.json")):
+        monkeypatch.setattr(dc, name, str(tmp_path / filename))
+    monkeypatch.setattr(dc, "BATCH_SIZE", 2)
+
+    asyncio.run(dc.run_classification_async())
+    classified = dc.load_json(dc.FILE_CLASSIFIED)
+    assert [item["Zdanie"] for item in classified] == SENTENCES
+    assert [item["Etykieta"] for item in classified] == [label_sentence(s) for s in SENTENCES]
+
+    capsys.readouterr()
+    asyncio.run(dc.run_classification_async())
+    assert "do przetworzenia: 0" in capsys.readouterr().out
+
+    monkeypatch.setattr(dc, "DEDUPLICATE", False)
+    asyncio.run(dc.run_classification_async())
+    assert "przeniesiono" in capsys.readouterr().out
+    assert [item["Zdanie"] for item in dc.load_json(dc.FILE_CLASSIFIED)] == sentences
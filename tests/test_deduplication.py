@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+# Skrypty z code/ importują się nawzajem po nazwie (jak przy uruchamianiu z tego katalogu)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
+
+from deduplication import MinHasher, deduplicate, find_clusters, lsh_params, shingles
+
+BASE = "Policja zatrzymała wczoraj w centrum Krakowie dwóch mężczyzn podejrzanych o kradzież samochodu"
+TEXTS = [
+    "Premier odwołał ministra zdrowia po kontroli w szpitalu wojewódzkim",
+    BASE,
+    "Pożar hali magazynowej pod Poznaniem gasiło kilkanaście zastępów straży",
+    BASE.upper() + "!!!",                                    # identyczne po normalizacji
+    BASE.replace("wczoraj", "w piątek"),                     # prawie identyczne
+    "Premier odwołał ministra zdrowia po kontroli w szpitalu wojewódzkim.",
+    "Słoneczny dzień nad morzem przyciągnął tłumy turystów na plaże",
+]
+
+def test_shingles_ignore_case_punctuation_and_whitespace():
+    assert shingles("Ala  ma KOTA!") == shingles("ala ma kota")
+    assert shingles("kot") == {"kot"}
+    assert len(next(iter(shingles("dłuższe zdanie")))) == 5
+
+def test_lsh_params_meet_recall_at_threshold():
+    bands, rows = lsh_params(0.8, 128)
+    assert bands * rows <= 128
+    assert 1 - (1 - 0.8 ** rows) ** bands >= 0.95
+    # Wyższy próg pozwala na dłuższe pasma (mniej fałszywych kandydatów)
+    assert lsh_params(0.95, 128)[1] >= rows
+
+def test_signature_is_deterministic_and_tracks_similarity():
+    hasher = MinHasher(128)
+    a, b = hasher.signature(TEXTS[1]), MinHasher(128).signature(TEXTS[1])
+    assert (a == b).all()
+    near = (a == hasher.signature(TEXTS[4])).mean()
+    far = (a == hasher.signature(TEXTS[6])).mean()
+    assert near > 0.6 > far
+
+def test_near_duplicates_grouped_and_first_occurrence_leads():
+    clusters = find_clusters(TEXTS, threshold=0.7)
+    assert clusters == [[0, 5], [1, 3, 4], [2], [6]]
+
+def test_high_threshold_keeps_only_exact_duplicates_together():
+    clusters = find_clusters(TEXTS, threshold=0.99)
+    assert [1, 3] in clusters and [4] in clusters
+
+def test_deduplicate_keeps_leaders_in_order_and_reports_label_conflicts():
+    labels = ["POLITYKA", "PRZESTEPSTWO", "KATASTROFA", "PRZESTEPSTWO", "BRAK_ZDARZENIA", "POLITYKA", "BRAK_ZDARZENIA"]
+    items = [{"Zdanie": text, "Etykieta": label} for text, label in zip(TEXTS, labels)]
+    kept, report = deduplicate(items, label_key="Etykieta", threshold=0.7)
+    assert kept == [items[0], items[1], items[2], items[6]]
+    assert report["input"] == 7 and report["kept"] == 4 and report["removed"] == 3
+    assert report["clusters"] == 2 and report["largest_cluster"] == 3
+    # Tylko klaster kradzieży ma różne etykiety; przykłady zaczynają się od reprezentanta
+    assert report["label_conflicts"] == 1
+    assert report["conflict_examples"][0][0] == (TEXTS[1], "PRZESTEPSTWO")
+    assert report["examples"][0][0] == TEXTS[1]
+
+def test_deduplicate_without_duplicates_or_labels():
+    items = [{"Zdanie": TEXTS[i]} for i in (0, 1, 2)]
+    kept, report = deduplicate(items)
+    assert kept == items
+    assert report["clusters"] == 0 and report["largest_cluster"] == 1
+    assert "label_conflicts" not in report
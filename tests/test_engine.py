@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("spacy")    # engine importuje spacy przy starcie (modele nie są potrzebne)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import split_into_chunks
+
+def wrap(text, width=40):
+    # Twarde zawijanie jak w plikach .txt z serwisów: pojedyncze \n w środku zdań
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return "\n".join(lines + [line])
+
+SENTENCE = "Policja zatrzymała wczoraj w Krakowie dwóch mężczyzn podejrzanych o kradzież."
+PARAGRAPHS = [wrap(f"Akapit {i}. " + SENTENCE + " Sprawą zajmuje się prokuratura rejonowa.") for i in range(12)]
+
+def test_chunks_end_on_paragraph_boundaries():
+    text = "\n\n".join(PARAGRAPHS) + "\n"
+    chunks = list(split_into_chunks(text, max_chars=400))
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    for chunk in chunks[:-1]:
+        assert chunk.endswith("\n\n")
+    # Zawinięte zdanie zawsze w całości w jednym fragmencie
+    for chunk in chunks:
+        assert chunk.count("Policja") == chunk.count("kradzież.")
+
+def test_long_paragraph_is_cut_after_sentence_end_not_at_line_break():
+    paragraph = wrap(" ".join([SENTENCE] * 10))
+    chunks = list(split_into_chunks(paragraph, max_chars=300))
+    assert len(chunks) > 1
+    assert "".join(chunks) == paragraph
+    for chunk in chunks:
+        assert len(chunk) <= 300
+        assert chunk.lstrip().startswith("Policja")
+        assert chunk.rstrip().endswith("kradzież.")
+
+def test_sentence_longer_than_limit_falls_back_to_whitespace():
+    text = " ".join(["słowo"] * 100)
+    chunks = list(split_into_chunks(text, max_chars=50))
+    assert "".join(chunks) == text
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert all(not word or word == "słowo" for chunk in chunks for word in chunk.split(" "))
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_store import EventStore, fold, normalize
+
+def record(text, label="PRZESTEPSTWO", score=0.9, **details):
+    slots = {"TRIGGER": "-", "KTO": "-", "CO": "-", "GDZIE": "-", "KIEDY": "-"}
+    slots.update(details)
+    return {"text": text, "label": label, "score": score, "details": slots}
+
+RECORDS = [
+    record("Złodziej ukradł rower w Łodzi.", TRIGGER="ukraść", KTO="Złodziej", GDZIE="w Łodzi", KIEDY="wczoraj"),
+    record("Premier odwołał ministra zdrowia.", label="POLITYKA", score=0.8, TRIGGER="odwołać", KTO="Premier"),
+    record("Pożar hali w Krakowie.", label="KATASTROFA", score=0.6, GDZIE="w Krakowie"),
+    record("Policja zatrzymała złodziejkę w Krakowie-Nowej Hucie.", score=0.4, KTO="Policja",
+           GDZIE="w Krakowie-Nowej Hucie", KIEDY="w nocy"),
+]
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / "events.sqlite"))
+    yield store
+    store.close()
+
+def texts(events):
+    return sorted(event["text"] for event in events)
+
+def test_normalization_folds_polish_letters_and_leading_preposition():
+    assert fold("Łódź Źdźbło") == "lodz zdzblo"
+    assert normalize("w Krakowie-Nowej Hucie") == "krakowie nowej hucie"
+    assert normalize("-") is None
+    assert normalize("w") == "w"
+
+def test_full_text_search_is_accent_insensitive_and_prefix_based(store):
+    store.add_records(RECORDS, source="a.txt")
+    # Prefiks: "zlodziej" trafia też w "złodziejkę"
+    assert texts(store.search(text="zlodziej")) == texts([RECORDS[0], RECORDS[3]])
+    assert texts(store.search(text="ZŁODZ krak")) == [RECORDS[3]["text"]]
+    assert store.count(text="zlodziej", label=["POLITYKA"]) == 0
+    # Sama interpunkcja nie tworzy pustego wyrażenia MATCH (błąd FTS5) - filtr jest pomijany
+    assert store.count(text="?!") == len(RECORDS)
+
+def test_slot_prefix_filters_use_normalized_values(store):
+    store.add_records(RECORDS, source="a.txt")
+    # "Kraków" po złożeniu to "krakow" - prefiks form "krakowie" i "krakowie nowej hucie"
+    assert texts(store.search(gdzie="Kraków")) == texts([RECORDS[2], RECORDS[3]])
+    assert texts(store.search(gdzie="w Krakowie-Nowej")) == [RECORDS[3]["text"]]
+    assert store.count(gdzie="Warszawa") == 0
+    assert texts(store.search(gdzie="w Łodzi")) == [RECORDS[0]["text"]]
+    assert texts(store.search(kto="premier")) == [RECORDS[1]["text"]]
+    assert store.count(kiedy="nocy") == 1
+    assert store.count(trigger="ukraść", min_score=0.5) == 1
+
+def test_missing_slots_are_stored_as_null(store):
+    store.add_records(RECORDS, source="a.txt")
+    event = store.search(text="pozar")[0]
+    assert event["trigger"] is None and event["kto"] is None and event["gdzie"] == "w Krakowie"
+
+def test_reinserting_after_resume_adds_only_new_positions(store):
+    # Przerwany przebieg zapisał dwa pierwsze rekordy; wznowienie powtarza je i dopisuje resztę
+    assert store.add_records(RECORDS[:2], source="korpus.jsonl", created_at=100.0) == 2
+    assert store.add_records(RECORDS, source="korpus.jsonl", created_at=200.0) == 2
+    assert store.add_records(RECORDS[2:], source="korpus.jsonl", start_position=2, created_at=300.0) == 0
+    assert store.size() == store.count() == len(RECORDS)
+    # Indeks pełnotekstowy zawiera każdy wiersz dokładnie raz
+    assert store.count(text="zlodziej") == 2
+    # Inne źródło z tymi samymi pozycjami to nowe zdarzenia
+    assert store.add_records(RECORDS[:1], source="inny.jsonl") == 1
+
+def test_multi_label_search_merges_newest_first(store):
+    for i, rec in enumerate(RECORDS):
+        store.add_records([rec], source=f"{i}.txt", created_at=float(i))
+    events = store.search(label=["PRZESTEPSTWO", "POLITYKA", "KATASTROFA"], limit=3)
+    assert [event["created_at"] for event in events] == [3.0, 2.0, 1.0]
+    page = store.search(label=["PRZESTEPSTWO", "POLITYKA", "KATASTROFA"], limit=2, offset=2)
+    assert [event["created_at"] for event in page] == [1.0, 0.0]
+    assert store.search(label=["POLITYKA"], since=1.5) == []
+    assert store.label_counts() == {"PRZESTEPSTWO": 2, "POLITYKA": 1, "KATASTROFA": 1}
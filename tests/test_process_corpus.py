@@ -0,0 +1,111 @@
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("spacy")    # process_corpus -> engine -> spacy (same modules as the app)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import process_corpus as pc
+
+class FakeAnalyzer:
+    # Deterministyczne etykiety bez modeli; zdanie fail_on udaje przerwanie przetwarzania
+    fail_on = None
+
+    def __init__(self, **kwargs):
+        pass
+
+    def analyze_sentences(self, texts, timer=None):
+        for text in texts:
+            if text == FakeAnalyzer.fail_on:
+                raise KeyboardInterrupt
+            yield {"label": "POLITYKA" if "premier" in text else "BRAK_ZDARZENIA", "score": 0.75,
+                   "details": {"KTO": text.split()[0], "GDZIE": "-"}}
+
+@pytest.fixture(autouse=True)
+def fake_analyzer(monkeypatch):
+    monkeypatch.setattr(pc, "EventAnalyzer", FakeAnalyzer)
+    monkeypatch.setattr(FakeAnalyzer, "fail_on", None)
+
+def write_input(path, sentences, extra=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, sentence in enumerate(sentences):
+            obj = {"Zdanie": sentence, "id": i}
+            if extra is not None:
+                obj["zrodlo"] = extra(i)
+            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+def run(*argv):
+    pc.run(pc.parse_args([str(a) for a in argv] + ["--workers", "0", "--chunk-size", "2"]))
+
+def read_jsonl(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert b"\0" not in data
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+SENTENCES = [f"zdanie {i} premier" if i % 2 else f"zdanie {i}" for i in range(7)]
+
+def test_resume_after_interruption_writes_each_row_once(tmp_path):
+    input_path, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(input_path, SENTENCES)
+    FakeAnalyzer.fail_on = SENTENCES[5]
+    with pytest.raises(KeyboardInterrupt):
+        run(input_path, output)
+    assert len(read_jsonl(output)) == 4
+
+    FakeAnalyzer.fail_on = None
+    run(input_path, output)
+    rows = read_jsonl(output)
+    assert [row["Zdanie"] for row in rows] == SENTENCES
+    assert rows[1]["Etykieta"] == "POLITYKA"
+
+def test_resume_refuses_checkpoint_of_other_input(tmp_path):
+    input_path, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(input_path, SENTENCES)
+    run(input_path, output)
+    write_input(input_path, SENTENCES + ["nowe zdanie"])
+    with pytest.raises(SystemExit):
+        run(input_path, output)
+    run(input_path, output, "--no-resume")
+    assert len(read_jsonl(output)) == len(SENTENCES) + 1
+
+def test_missing_output_restarts_from_zero(tmp_path, capsys):
+    input_path, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(input_path, SENTENCES)
+    FakeAnalyzer.fail_on = SENTENCES[5]
+    with pytest.raises(KeyboardInterrupt):
+        run(input_path, output)
+    os.remove(output)
+
+    FakeAnalyzer.fail_on = None
+    run(input_path, output)
+    assert "zaczynam od początku" in capsys.readouterr().out
+    assert [row["Zdanie"] for row in read_jsonl(output)] == SENTENCES
+
+def test_parquet_resume_keeps_one_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    input_path, output = tmp_path / "in.jsonl", tmp_path / "out.parquet"
+    # Pole "zrodlo" puste w pierwszej części - typ nie może zależeć od tego, która część była pierwsza
+    write_input(input_path, SENTENCES, extra=lambda i: None if i < 2 else f"src-{i}")
+    FakeAnalyzer.fail_on = SENTENCES[5]
+    with pytest.raises(KeyboardInterrupt):
+        run(input_path, output)
+    # Pozostałość po przerwanym zapisie i obcy plik w katalogu wyjściowym
+    (output / "part-00009.parquet").write_bytes(b"niedokonczony")
+    (output / "notatki.txt").write_text("nie usuwać")
+
+    FakeAnalyzer.fail_on = None
+    run(input_path, output)
+    parts = sorted(name for name in os.listdir(output) if name.endswith(".parquet"))
+    assert parts == [f"part-{i:05d}.parquet" for i in range(4)]
+    assert (output / "notatki.txt").exists()
+    schemas = {pq.read_schema(output / name) for name in parts}
+    assert len(schemas) == 1
+    schema = schemas.pop()
+    assert str(schema.field("Pewnosc").type) == "double"
+    assert str(schema.field("zrodlo").type) == "string"
+    texts = [text for name in parts for text in pq.read_table(output / name).column("Zdanie").to_pylist()]
+    assert texts == SENTENCES
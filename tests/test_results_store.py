@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("spacy")    # results_store -> engine -> spacy (modele nie są potrzebne)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import CATEGORIES, STAGE_FAST, STAGE_FULL
+from results_store import EXPORT_COLUMNS, INITIAL_CAPACITY, ResultStore
+
+def record(text, label, score, stage=STAGE_FULL, **details):
+    scores = {category: 0.0 for category in CATEGORIES}
+    scores[label] = score
+    return {"text": text, "label": label, "score": score, "scores_full": scores,
+            "details": details, "stage": stage}
+
+RECORDS = [
+    record("Policja zatrzymała złodzieja w Krakowie.", "PRZESTEPSTWO", 0.7, KTO="Policja", GDZIE="w Krakowie"),
+    record("Słoneczny dzień nad morzem.", "BRAK_ZDARZENIA", 0.95, stage=STAGE_FAST),
+    record("Premier odwołał ministra, \"nagle\".", "POLITYKA", 0.8125, TRIGGER="odwołać", KTO="Premier"),
+    record("Zwykłe zdanie.", "BRAK_ZDARZENIA", 0.6, stage=STAGE_FAST),
+]
+
+def filled(with_source=False):
+    store = ResultStore(with_source=with_source)
+    if with_source:
+        for i, rec in enumerate(RECORDS):
+            store.append(rec, source=f"doc-{i % 2}.txt")
+        return store
+    return store.extend(RECORDS)
+
+def test_append_and_read_back_records():
+    store = filled()
+    assert len(store) == len(RECORDS)
+    for i, rec in enumerate(RECORDS):
+        back = store.record(i)
+        assert back["text"] == rec["text"] and back["label"] == rec["label"] and back["stage"] == rec["stage"]
+        assert back["score"] == pytest.approx(rec["score"])
+        # Brakujące pola szczegółów wypełnia "-"
+        assert back["details"]["KTO"] == rec["details"].get("KTO", "-")
+        assert back["details"]["KIEDY"] == "-"
+
+def test_growth_beyond_initial_capacity_keeps_rows():
+    store = ResultStore()
+    n = INITIAL_CAPACITY * 2 + 3
+    for i in range(n):
+        store.append(RECORDS[i % len(RECORDS)])
+    assert len(store) == n
+    assert store.record(n - 1)["text"] == RECORDS[(n - 1) % len(RECORDS)]["text"]
+    assert store.score(0) == pytest.approx(0.7)
+
+def test_filters_and_counts():
+    store = filled()
+    assert store.indices().tolist() == [0, 1, 2, 3]
+    assert store.indices(exclude_label="BRAK_ZDARZENIA").tolist() == [0, 2]
+    counts = store.label_counts()
+    assert set(counts) == set(CATEGORIES)
+    assert counts["BRAK_ZDARZENIA"] == 2 and counts["PRZESTEPSTWO"] == 1 and counts["WYPADEK"] == 0
+    assert store.stage_count(STAGE_FAST) == 2 and store.stage_count(STAGE_FULL) == 2
+
+def expected_rows(with_source=False):
+    rows = []
+    for i, rec in enumerate(RECORDS):
+        row = {"Zdanie": rec["text"], "Etykieta": rec["label"], "Pewnosc": rec["score"], "Etap": rec["stage"]}
+        for field in EXPORT_COLUMNS[4:]:
+            row[field] = rec["details"].get(field, "-")
+        if with_source:
+            row["Dokument"] = f"doc-{i % 2}.txt"
+        rows.append(row)
+    return rows
+
+@pytest.mark.parametrize("with_source", [False, True])
+def test_jsonl_round_trip(with_source):
+    stream = io.StringIO()
+    filled(with_source).write_jsonl(stream)
+    rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+    # Pewność zaokrąglona do float32 bez artefaktów (0.7, nie 0.699999988)
+    assert rows == expected_rows(with_source)
+
+def test_csv_round_trip_with_quotes_and_commas():
+    stream = io.StringIO()
+    store = filled(with_source=True)
+    store.write_csv(stream)
+    reader = csv.DictReader(io.StringIO(stream.getvalue()))
+    assert reader.fieldnames == ["Dokument"] + EXPORT_COLUMNS
+    rows = [dict(row, Pewnosc=float(row["Pewnosc"])) for row in reader]
+    assert rows == expected_rows(with_source=True)
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "parquet"])
+def test_export_file_writes_temp_file(fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow.parquet")
+    path = filled().export_file(fmt)
+    try:
+        assert path.endswith(f".{fmt}") and os.path.getsize(path) > 0
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            table = pq.read_table(path)
+            assert table.column_names == EXPORT_COLUMNS
+            assert table.column("Zdanie").to_pylist() == [rec["text"] for rec in RECORDS]
+            assert [str(label) for label in table.column("Etykieta").to_pylist()] == [rec["label"] for rec in RECORDS]
+            assert table.column("Pewnosc").to_pylist() == pytest.approx([rec["score"] for rec in RECORDS])
+    finally:
+        os.remove(path)
+
+def test_parquet_in_multiple_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "wyniki.parquet"
+    filled(with_source=True).write_parquet(str(path), batch_size=3)
+    parquet = pq.ParquetFile(str(path))
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column("Dokument").to_pylist() == [f"doc-{i % 2}.txt" for i in range(len(RECORDS))]
+    assert table.column("Etap").to_pylist() == [rec["stage"] for rec in RECORDS]